@@ -284,7 +284,12 @@ class Builder(object):
         self._node_to_bnode[id(node)] = bnode
 
         bnode.init_builder(self)
-        bnode.init_node(node)
+        # building makes lots of finds per node, index it meanwhile
+        node.set_find_index(True)
+        try:
+            bnode.init_node(node)
+        finally:
+            node.set_find_index(False)
 
         if mark_used:
             self._used_node[id(node)] = True #register usage for unused detection
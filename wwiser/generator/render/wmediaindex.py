@@ -27,15 +27,11 @@ class MediaIndex(object):
         if chunkname != 'MediaIndex':
             return
 
-        # preload indexes for internal wems
-        bankname = nchunk.get_root().get_filename()
-        nsids = nchunk.finds(type='sid')
-        for nsid in nsids:
-            sid = nsid.value()
-            attrs = nsid.get_parent().get_attrs()
-            index = attrs.get('index')
-            if index is not None:
-                self._add_media_index(bankname, sid, index)
+        # preload indexes for internal wems (registered by the parser)
+        root = nchunk.get_root()
+        bankname = root.get_filename()
+        for sid, index in root.get_media_items():
+            self._add_media_index(bankname, sid, index)
         return
 
     # A game could load bgm.bnk + media1.bnk, and bgm.bnk point to sid=123 in media1.bnk.
@@ -238,9 +238,8 @@ class Generator(object):
                     self._globalsettings.load(nchunk)
 
                 elif chunkname == 'HircChunk':
-                    items = bank.find(name='listLoadedItem')
-                    if not items: # media-only banks don't have items
-                        continue
+                    # media-only banks don't have items
+                    items = root.get_hirc_items()
 
                     # HIRC node order is semi-fixed following these rules:
                     # - devices xN > buses xN > audio hierarchy (sound or music) xN > action+event xN
@@ -271,13 +270,11 @@ class Generator(object):
                     #
                     # So might as well be random.
 
-                    for node in items.get_children():
-                        nsid = node.find1(type='sid')
-                        if not nsid:
+                    for sid, (_, node, _, _) in items:
+                        if sid is None:
                             hircname = node.get_name()
                             logging.info("generator: not found for %s in %s", hircname, bankname) #???
                             continue
-                        sid = nsid.value()
 
                         self._builder.register_node(bank_id, sid, node)
 
@@ -303,7 +300,7 @@ class Generator(object):
         return
 
     def _write_bank(self, bank):
-        items = bank.find(name='listLoadedItem')
+        items = bank.get_root().get_hirc_items()
         if not items:
             return
 
@@ -312,13 +309,12 @@ class Generator(object):
         nodes_unnamed = []
 
         # save candidate nodes to generate
-        nodes = items.get_children()
-        for node in nodes:
-            classname = node.get_name()
-            nsid = node.find1(type='sid')
-            if not nsid:
+        for sid, (_, node, _, nsid) in items:
+            if sid is None:
                 continue
-            #sid = nsid.value()
+            classname = node.get_name()
+            if not nsid: #lazy items
+                nsid = node.find1(type='sid') #for names
 
             # how nodes are accepted:
             # - filter not active: accept certain objects, and put them into named/unnamed lists (affects dupes)
@@ -327,7 +323,7 @@ class Generator(object):
             if self._filter.active:
                 allow = self._filter.allow_outer(node, nsid, classname=classname)
                 if allow:
-                    nodes_allow.append(node)
+                    nodes_allow.append((nsid, node))
                     continue
                 elif not self._filter.generate_rest:
                     continue # ignore non-"rest" nodes
@@ -347,10 +343,10 @@ class Generator(object):
             # as dupes. Can be disabled to treat all as unnamed = in bank order.
             hashname = nsid.get_attr('hashname')
             if hashname and not self._bank_order:
-                item = (hashname, node)
+                item = (hashname, nsid, node)
                 nodes_named.append(item)
             else:
-                item = (nsid.value(), node)
+                item = (nsid.value(), nsid, node)
                 nodes_unnamed.append(item)
 
         # prepare nodes in final order
@@ -361,16 +357,16 @@ class Generator(object):
         # older python(?) may choke when trying to sort name+nodes, set custom handler to force hashname only
         nodes_named.sort(key=lambda x: x[0] )
 
-        for __, node in nodes_named:
-            nodes.append(node)
-        for __, node in nodes_unnamed:
-            nodes.append(node)
+        for __, nsid, node in nodes_named:
+            nodes.append((nsid, node))
+        for __, nsid, node in nodes_unnamed:
+            nodes.append((nsid, node))
 
         logging.debug("generator: writting bank nodes (names: %s, unnamed: %s, filtered: %s)", len(nodes_named), len(nodes_unnamed), len(nodes_allow))
 
         # make txtp for nodes
-        for node in nodes:
-            logging.debug("node: %s", node.find1(type='sid').value())
+        for nsid, node in nodes:
+            logging.debug("node: %s", nsid.value())
             self._render_txtp(node)
 
         return
@@ -2,7 +2,7 @@ import logging, re, os, os.path, sys
 from datetime import datetime
 
 from .. import wfnv
-from ..parser import wdefs
+from ..parser import wdefs, wmodel
 from .wsqlite import SqliteHandler
 from .wnamerow import NameRow
 from . import wnconfig
@@ -44,10 +44,16 @@ class Names(object):
         self._loaded_wwnames = {}
         self._current_bankpaths = {} #existing banks info, in the form of (bank, localized) = path
         self._missing = {} # [hashtype] = {(bank, localized)} = [ids]
+        self._missing_keys = {} # [id] = {(hashtype, (bank, localized))}, to find ids in _missing
         self._fnv = wfnv.Fnv()
+        self._preload_db = False
+        self._generation = 0 #changes when names are loaded, for callers caching named output
         # flags
         self._cfg = wnconfig.Config()
 
+    def get_generation(self):
+        return self._generation
+
     def set_gamename(self, gamename):
         self._gamename = gamename #path
 
@@ -139,11 +145,18 @@ class Names(object):
 
         ids[id] = True
 
+        keys = self._missing_keys.get(id)
+        if not keys:
+            keys = set()
+            self._missing_keys[id] = keys
+        keys.add((hashtype, bankkey))
+
     def _unmark_unused(self, id):
-        for hashtype in self._missing.keys():
-            for bankkey in self._missing[hashtype].keys():
-                if id in self._missing[hashtype][bankkey]:
-                    del self._missing[hashtype][bankkey][id]
+        keys = self._missing_keys.pop(id, None)
+        if not keys:
+            return
+        for hashtype, bankkey in keys:
+            del self._missing[hashtype][bankkey][id]
 
     def get_namerow(self, id, hashtype=None, node=None):
         if not id or id == -1: #including id=0, that is used as "none"
@@ -371,8 +384,11 @@ class Names(object):
 
         # automatically from program folder, only one db3 is allowed
         self.parse_db(db)
+        if self._preload_db:
+            self._preload_ids(banks)
 
         self.set_bankname(None)
+        self._generation += 1
 
         logging.info("names: done")
 
@@ -859,6 +875,40 @@ class Names(object):
         if self._db:
             self._db.close()
 
+    # read db names for all ids in banks at once, rather than when each name is needed
+    def set_preload_db(self, flag):
+        self._preload_db = flag
+
+    # Gets all sid/tid in banks' fields not in current names, then loads them (and their fuzzy
+    # ranges) from the db with a few queries. Lazy items that aren't loaded yet are ignored.
+    def _preload_ids(self, banks):
+        if not self._db or not self._db.is_open():
+            return
+
+        ids = set()
+        for bank in banks:
+            nodes = [bank]
+            while nodes:
+                node = nodes.pop()
+                if node.get_type_id() in (wmodel.SYMBOL_SID, wmodel.SYMBOL_TID):
+                    ids.add(node.value())
+
+                if node.is_lazy():
+                    children = node.get_loaded_children()
+                else:
+                    children = node.get_children()
+                if children:
+                    nodes.extend(children)
+
+        ids = [id for id in ids if id and id != -1 and id not in self._names]
+
+        bases = None
+        if not self._cfg.disable_fuzzy:
+            bases = [id & 0xFFFFFF00 for id in ids]
+
+        logging.info("names: preloading %i ids from db", len(ids))
+        self._db.preload(ids, bases)
+
     # saves loaded hashnames to .txt
     # (useful to check names when loading generic db/lst of names)
     def save_lst(self, basename=None, path=None):
@@ -1,4 +1,5 @@
-import logging, os, os.path, sys, sqlite3
+import logging, os, os.path, sys, sqlite3, threading
+from collections import OrderedDict
 from .wnamerow import NameRow
 
 # wwnames.db3 database handler
@@ -7,9 +8,16 @@ from .wnamerow import NameRow
 
 class SqliteHandler(object):
     BATCH_COUNT = 50000     #more=higher memory, but much faster for huge (500000+) sets
+    CACHE_SIZE = 0x10000    #recent lookups (found or not) kept in memory
+    SELECT_COUNT = 500      #ids per query in bulk selects (sqlite has a max number of params)
 
     def __init__(self):
         self._cx = None
+        self._lock = threading.Lock() #for cx and caches
+        self._cache = OrderedDict() #id > (id, name) or None
+        self._cache_fuzzy = OrderedDict() #base id > (id, name) or None
+        self._preloaded = {} #same as caches but unbounded (see preload)
+        self._preloaded_fuzzy = {}
 
     def is_open(self):
         return self._cx
@@ -39,14 +47,30 @@ class SqliteHandler(object):
         logging.info("names: loading %s", filename)
 
         #by default each thread needs its own cx (ex. viewer/server thread vs dumper/main thread),
-        #but we don't really care since it's mostly read-only (could use some kinf od threadlocal?)
+        #but a single cx is shared, with queries done under the lock
         self._cx = sqlite3.connect(path, check_same_thread=False)
         self._setup()
 
     def close(self):
         if not self._cx:
             return
-        self._cx.close()
+        with self._lock:
+            self._cx.close()
+
+    # LRU of recent results (including missing ids, as most ids aren't in the db)
+    def _get_cached(self, cache, key):
+        with self._lock:
+            row = cache.get(key, False)
+            if row is not False:
+                cache.move_to_end(key)
+            return row
+
+    def _set_cached(self, cache, key, row):
+        with self._lock:
+            cache[key] = row
+            cache.move_to_end(key)
+            if len(cache) > self.CACHE_SIZE:
+                cache.popitem(last=False)
 
     def save(self, names, hashonly=False, save_all=False, save_companion=False):
         if not self._cx:
@@ -54,6 +78,16 @@ class SqliteHandler(object):
         if not names:
             return
 
+        with self._lock:
+            self._save(names, hashonly, save_all, save_companion)
+
+            # missing ids may exist now
+            self._cache.clear()
+            self._cache_fuzzy.clear()
+            self._preloaded = {}
+            self._preloaded_fuzzy = {}
+
+    def _save(self, names, hashonly, save_all, save_companion):
         cx = self._cx
         cur = cx.cursor()
 
@@ -90,36 +124,102 @@ class SqliteHandler(object):
     def _to_namerow(self, row):
         #id = row['id']
         #name = row['name']
+        if not row:
+            return None
         id, name = row
         return NameRow(id, hashname=name)
 
     def select_by_id(self, id):
         if not self._cx:
             return
-        #with closing(db.cursor()) as cursor: ???
-        cur = self._cx.cursor()
 
-        params = (id,)
-        cur.execute("SELECT id, name FROM names WHERE id = ?", params)
-        rows = cur.fetchall()
-        for row in rows:
+        row = self._preloaded.get(id, False)
+        if row is False:
+            row = self._get_cached(self._cache, id)
+        if row is not False:
             return self._to_namerow(row)
-        return None
+
+        #with closing(db.cursor()) as cursor: ???
+        with self._lock:
+            cur = self._cx.cursor()
+
+            params = (id,)
+            cur.execute("SELECT id, name FROM names WHERE id = ?", params)
+            row = cur.fetchone()
+        self._set_cached(self._cache, id, row)
+        return self._to_namerow(row)
 
     def select_by_id_fuzzy(self, id):
         if not self._cx:
             return
-        cur = self._cx.cursor()
 
         #FNV hashes only change last byte when last char changes. We can use this property to get
         # close names (like "bgm1"=1189781958 / 0x46eaa1c6 and "bgm2"=1189781957 / 0x46eaa1c5)
         id = id & 0xFFFFFF00
-        params = (id + 0, id + 256)
-        cur.execute("SELECT id, name FROM names WHERE id >= ? AND id < ?", params)
-        rows = cur.fetchall()
-        for row in rows:
+
+        row = self._preloaded_fuzzy.get(id, False)
+        if row is False:
+            row = self._get_cached(self._cache_fuzzy, id)
+        if row is not False:
             return self._to_namerow(row)
-        return None
+
+        with self._lock:
+            cur = self._cx.cursor()
+
+            params = (id + 0, id + 256)
+            cur.execute("SELECT id, name FROM names WHERE id >= ? AND id < ?", params)
+            row = cur.fetchone()
+        self._set_cached(self._cache_fuzzy, id, row)
+        return self._to_namerow(row)
+
+    # Selects all ids and fuzzy ranges (base ids) at once, to be used by later selects rather
+    # than querying each. Results are kept until closed (unlike the cache, that is limited).
+    def preload(self, ids, bases=None):
+        if not self._cx:
+            return
+
+        ids = set(ids)
+        with self._lock:
+            rows = self._select_rows(ids)
+        for id in ids:
+            self._preloaded[id] = rows.get(id)
+
+        if bases:
+            bases = set(bases)
+            with self._lock:
+                rows = self._select_rows_fuzzy(bases)
+            for base in bases:
+                self._preloaded_fuzzy[base] = rows.get(base)
+
+    # returns dict of id > (id, name) for found ids (called with lock)
+    def _select_rows(self, ids):
+        ids = list(ids)
+        rows = {}
+        cur = self._cx.cursor()
+        for i in range(0, len(ids), self.SELECT_COUNT):
+            params = ids[i : i + self.SELECT_COUNT]
+            marks = ','.join('?' * len(params))
+            cur.execute("SELECT id, name FROM names WHERE id IN (%s)" % (marks), params)
+            for row in cur.fetchall():
+                rows[row[0]] = row
+        return rows
+
+    # returns dict of base id > (id, name) for found ranges (first id, same as select_by_id_fuzzy, called with lock)
+    def _select_rows_fuzzy(self, bases):
+        rows = {}
+        cx = self._cx
+        cur = cx.cursor()
+        try:
+            # join each base with its range, as a list of ranges can't be passed to a single query
+            cur.execute("CREATE TEMP TABLE IF NOT EXISTS fuzzy_ids(id integer PRIMARY KEY)")
+            cur.execute("DELETE FROM fuzzy_ids")
+            cur.executemany("INSERT INTO fuzzy_ids(id) VALUES(?)", ((base,) for base in bases))
+            cur.execute("SELECT f.id, MIN(n.id), n.name FROM fuzzy_ids f JOIN names n ON n.id >= f.id AND n.id < f.id + 256 GROUP BY f.id")
+            for base, id, name in cur.fetchall():
+                rows[base] = (id, name)
+        finally:
+            cx.rollback()
+        return rows
 
     def _setup(self):
         cx = self._cx
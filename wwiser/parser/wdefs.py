@@ -252,7 +252,6 @@ AkBank__AKBKHircType_128 = wfmt.FormatterLUT({
   0x15: "Audio Device",
   0x16: "Time Mod",
 })
-AkBank__AKBKHircType = None
 
 #048>=
 AkPluginType = wfmt.FormatterLUT({
@@ -450,7 +449,6 @@ AkCurveScaling_072 = wfmt.FormatterLUT({
   0x4: "dBToLin", #088>=
   #0x8: "MaxNum", #088>>
 })
-AkCurveScaling = None
 
 #112>= 140<=
 AkRtpcType_140 = wfmt.FormatterLUT({
@@ -469,7 +467,6 @@ AkRtpcType_144 = wfmt.FormatterLUT({
   #0x5: "Count",
   #0x8: "MaxNum",
 })
-AkRtpcType = None
 
 #048>=
 AkCurveInterpolation = wfmt.FormatterLUT({
@@ -972,7 +969,6 @@ AkPropID_154 = wfmt.FormatterLUT({
   0x4B: "AttenuationID",
   #0x4C: "NUM",
 })
-AkPropID = None
 AkPropID_tids = {
     "AttachedPluginFXID", "AttenuationID"
 }
@@ -990,7 +986,6 @@ AkBank__AKBKSourceType_112 = wfmt.FormatterLUT({
     0x01: "PrefetchStreaming",
     0x02: "Streaming",
 })
-AkBank__AKBKSourceType = None
 
 #046>= 056<=
 AkActionType_056 = wfmt.FormatterLUT({
@@ -1219,7 +1214,6 @@ AkActionType_062 = wfmt.FormatterLUT({
   0x3704: "ResetAllBypassFX_ALL", #150>=
   0x3705: "ResetAllBypassFX_ALL_O", #150>=
 }, zeropad=4)
-AkActionType = None
 
 #046>= 088<=
 AkMusicTrackRanSeqType = wfmt.FormatterLUT({
@@ -1259,7 +1253,6 @@ AkBuiltInParam_128 = wfmt.FormatterLUT({
   0x9: "TransmissionLoss",
   #0xA: "Max",
 })
-AkBuiltInParam = None
 
 #046>=
 AkDecisionTree__Mode = wfmt.FormatterLUT({
@@ -1323,7 +1316,6 @@ AkClipAutomationType_112 = wfmt.FormatterLUT({
   0x3: "FadeIn",
   0x4: "FadeOut",
 })
-AkClipAutomationType = None
 
 #046>=
 AkPathMode = wfmt.FormatterLUT({
@@ -1353,7 +1345,6 @@ AkRtpcAccum_128 = wfmt.FormatterLUT({
   0x6: "Filter",
   #0x8: "MaxNum/Count",
 })
-AkRtpcAccum = None
 
 #046>=
 AkValueMeaning = wfmt.FormatterLUT({
@@ -1879,7 +1870,6 @@ AkRTPC_ParameterID_135 = wfmt.FormatterLUT({
   0x3F: "Unknown/Custom?", #AC Valhalla
 })
 #AkRTPC_ParameterID_150 = AkPropID_150 #not defined? same as a regular prop? internally AkRtpcPropID
-AkRTPC_ParameterID = None
 
 #118>=
 AkRTPC_ModulatorParamID = wfmt.FormatterLUT({
@@ -1952,7 +1942,6 @@ AkModulatorPropID_150 = wfmt.FormatterLUT({
   0x14: "Time_InitialDelay",
   #0x15: "NUM",
 })
-AkModulatorPropID = None
 AkModulatorPropID_tids = {
 }
 
@@ -2203,103 +2192,103 @@ CAkHarmonizerFX__AkFilterType_0 = wfmt.FormatterLUT({
 # #############################################################################
 # VERSION SETUP
 
-def setup(version):
-    #many of these enums are very similar but annoyingly put new values in the middle,
-    #so versions without SDK to check are likely wrong. It's also hard to guess given
-    #the huge number of parameters
-
-    global AkCurveScaling
-    if   version <= 62:
-        AkCurveScaling = AkCurveScaling_062
-    elif   version <= 65:
-        AkCurveScaling = AkCurveScaling_065
-    else:
-        AkCurveScaling = AkCurveScaling_072
-
-    global AkRtpcType
-    if   version <= 140:
-        AkRtpcType = AkRtpcType_140
-    else:
-        AkRtpcType = AkRtpcType_144
-
-    global AkRTPC_ParameterID
-    if   version <= 45:
-        AkRTPC_ParameterID = AkRTPC_ParameterID_045
-    elif version <= 53:
-        AkRTPC_ParameterID = AkRTPC_ParameterID_053
-    elif version <= 65:
-        AkRTPC_ParameterID = AkRTPC_ParameterID_065
-    elif version <= 72:
-        AkRTPC_ParameterID = AkRTPC_ParameterID_072
-    elif version <= 89:
-        AkRTPC_ParameterID = AkRTPC_ParameterID_088
-    elif version <= 113:
-        AkRTPC_ParameterID = AkRTPC_ParameterID_113
-    elif version <= 118:
-        AkRTPC_ParameterID = AkRTPC_ParameterID_118
-    elif version <= 134:
-        AkRTPC_ParameterID = AkRTPC_ParameterID_134
-    else:
-        AkRTPC_ParameterID = AkRTPC_ParameterID_135
-
-    global AkModulatorPropID
-    if  version <= 145:
-        AkModulatorPropID = AkModulatorPropID_112
-    else:
-        AkModulatorPropID = AkModulatorPropID_150
-
-    global AkRtpcAccum
-    if  version <= 125:
-        AkRtpcAccum = AkRtpcAccum_125
-    else:
-        AkRtpcAccum = AkRtpcAccum_128
-
-    global AkActionType
-    if  version <= 56:
-        AkActionType = AkActionType_056
-    else:
-        AkActionType = AkActionType_062
-
-    global AkBank__AKBKSourceType
-    if  version <= 89:
-        AkBank__AKBKSourceType = AkBank__AKBKSourceType_088
-    else:
-        AkBank__AKBKSourceType = AkBank__AKBKSourceType_112
-
-    global AkPropID
-    if    version <= 62:
-        AkPropID = AkPropID_062
-    elif  version <= 65:
-        AkPropID = AkPropID_065
-    elif  version <= 89:
-        AkPropID = AkPropID_088
-    elif version <= 113:
-        AkPropID = AkPropID_113
-    elif version <= 126:
-        AkPropID = AkPropID_126
-    elif version <= 145:
-        AkPropID = AkPropID_128
-    elif version <= 150:
-        AkPropID = AkPropID_150
-    else:
-        AkPropID = AkPropID_154
-
-    global AkBank__AKBKHircType
-    if version <= 126:
-        AkBank__AKBKHircType = AkBank__AKBKHircType_126
-    else:
-        AkBank__AKBKHircType = AkBank__AKBKHircType_128
-
-    global AkBuiltInParam
-    if version <= 126:
-        AkBuiltInParam = AkBuiltInParam_126
-    else:
-        AkBuiltInParam = AkBuiltInParam_128
-
-    global AkClipAutomationType
-    if version <= 89:
-        AkClipAutomationType = AkClipAutomationType_088
-    else:
-        AkClipAutomationType = AkClipAutomationType_112
-
-    return
+# Version-dependent definitions. Created once per version (see get_defs) and stored in the bank's root
+# so parsing doesn't depend on global state (banks of different versions may be parsed at the same time).
+class VersionDefs(object):
+    def __init__(self, version):
+        #many of these enums are very similar but annoyingly put new values in the middle,
+        #so versions without SDK to check are likely wrong. It's also hard to guess given
+        #the huge number of parameters
+        self.version = version
+
+        if   version <= 62:
+            self.AkCurveScaling = AkCurveScaling_062
+        elif   version <= 65:
+            self.AkCurveScaling = AkCurveScaling_065
+        else:
+            self.AkCurveScaling = AkCurveScaling_072
+
+        if   version <= 140:
+            self.AkRtpcType = AkRtpcType_140
+        else:
+            self.AkRtpcType = AkRtpcType_144
+
+        if   version <= 45:
+            self.AkRTPC_ParameterID = AkRTPC_ParameterID_045
+        elif version <= 53:
+            self.AkRTPC_ParameterID = AkRTPC_ParameterID_053
+        elif version <= 65:
+            self.AkRTPC_ParameterID = AkRTPC_ParameterID_065
+        elif version <= 72:
+            self.AkRTPC_ParameterID = AkRTPC_ParameterID_072
+        elif version <= 89:
+            self.AkRTPC_ParameterID = AkRTPC_ParameterID_088
+        elif version <= 113:
+            self.AkRTPC_ParameterID = AkRTPC_ParameterID_113
+        elif version <= 118:
+            self.AkRTPC_ParameterID = AkRTPC_ParameterID_118
+        elif version <= 134:
+            self.AkRTPC_ParameterID = AkRTPC_ParameterID_134
+        else:
+            self.AkRTPC_ParameterID = AkRTPC_ParameterID_135
+
+        if  version <= 145:
+            self.AkModulatorPropID = AkModulatorPropID_112
+        else:
+            self.AkModulatorPropID = AkModulatorPropID_150
+
+        if  version <= 125:
+            self.AkRtpcAccum = AkRtpcAccum_125
+        else:
+            self.AkRtpcAccum = AkRtpcAccum_128
+
+        if  version <= 56:
+            self.AkActionType = AkActionType_056
+        else:
+            self.AkActionType = AkActionType_062
+
+        if  version <= 89:
+            self.AkBank__AKBKSourceType = AkBank__AKBKSourceType_088
+        else:
+            self.AkBank__AKBKSourceType = AkBank__AKBKSourceType_112
+
+        if    version <= 62:
+            self.AkPropID = AkPropID_062
+        elif  version <= 65:
+            self.AkPropID = AkPropID_065
+        elif  version <= 89:
+            self.AkPropID = AkPropID_088
+        elif version <= 113:
+            self.AkPropID = AkPropID_113
+        elif version <= 126:
+            self.AkPropID = AkPropID_126
+        elif version <= 145:
+            self.AkPropID = AkPropID_128
+        elif version <= 150:
+            self.AkPropID = AkPropID_150
+        else:
+            self.AkPropID = AkPropID_154
+
+        if version <= 126:
+            self.AkBank__AKBKHircType = AkBank__AKBKHircType_126
+        else:
+            self.AkBank__AKBKHircType = AkBank__AKBKHircType_128
+
+        if version <= 126:
+            self.AkBuiltInParam = AkBuiltInParam_126
+        else:
+            self.AkBuiltInParam = AkBuiltInParam_128
+
+        if version <= 89:
+            self.AkClipAutomationType = AkClipAutomationType_088
+        else:
+            self.AkClipAutomationType = AkClipAutomationType_112
+
+_defs_cache = {}
+
+def get_defs(version):
+    defs = _defs_cache.get(version)
+    if not defs:
+        defs = VersionDefs(version)
+        _defs_cache[version] = defs
+    return defs
@@ -1,3 +1,4 @@
+from . import wsymbols
 
 # finds nodes in a node's tree based on config, external to simplify but could be optimized
 # if added to model to avoid generating attrs dicts
@@ -18,12 +19,22 @@ class NodeFinder(object):
         self.names = names
         self.types = types
         self.values = values
+        # compare interned ids rather than strings (registered as lazy objects may add names later)
+        self.name_ids = self._get_symbols(names)
+        self.type_ids = self._get_symbols(types)
         self.results = []
         self.first = False
         self.base = False
         self.contains = contains
         self.empty = not names and not types and not values and not contains
+        # simple queries (single name or type) may use the node's index
+        self.indexable = len(names) + len(types) == 1 and not values and not contains
 
+    def _get_symbols(self, items):
+        symbols = []
+        for item in items:
+            symbols.append(wsymbols.get_symbol(item))
+        return symbols
 
     def find1(self, node):
         return self.find(node, first=True)
@@ -34,9 +45,10 @@ class NodeFinder(object):
         self.first = first
         self.depth = 0
 
-        # aim for outer nodes first as it's slightly faster in some cases
-        #self._find_inner(node)
-        self._find_outer([node])
+        if not self._find_index(node):
+            # aim for outer nodes first as it's slightly faster in some cases
+            #self._find_inner(node)
+            self._find_outer([node])
 
         if self.results:
             if len(self.results) > 1:
@@ -50,12 +62,30 @@ class NodeFinder(object):
             return []
         self.depth = 0
 
-        # aim for outer nodes first as it's slightly faster in some cases
-        #self._find_inner(node)
-        self._find_outer([node])
+        if not self._find_index(node):
+            # aim for outer nodes first as it's slightly faster in some cases
+            #self._find_inner(node)
+            self._find_outer([node])
 
         return self.results
 
+    # find query in node's index (if possible), returns results in the same order as _find_outer
+    def _find_index(self, node):
+        if not self.indexable or self.base:
+            return False
+        index = node.get_find_index()
+        if not index:
+            return False
+
+        if self.names:
+            results = index.get_names(self.name_ids)
+        else:
+            results = index.get_types(self.type_ids)
+        if self.first:
+            results = results[0:1]
+        self.results = list(results)
+        return True
+
     # find query in tree, going in depth first:
     # A > B > C
     #         > D
@@ -110,12 +140,27 @@ class NodeFinder(object):
         # find query on children level
         for node in nodes:
             self.depth += 1
-            self._find_outer(node.get_children())
+            if node.is_lazy():
+                self._find_outer_lazy(node)
+            else:
+                self._find_outer(node.get_children())
             self.depth -= 1
             # target exists and only need one result: stop
             if self.first and self.results:
                 return
 
+    # lazy nodes have some children loaded (like IDs) that may be enough, otherwise load the rest
+    def _find_outer_lazy(self, node):
+        loaded = node.get_loaded_children()
+        loaded_count = len(loaded) #may be the same list once loaded
+        self._find_outer(loaded)
+        if self.first and self.results:
+            return
+
+        children = node.get_children()
+        if children:
+            self._find_outer(children[loaded_count:])
+
 
     def _query(self, node):
         # may simplify with a list of find key + value (like contains)?
@@ -125,17 +170,19 @@ class NodeFinder(object):
         if not valid:
             return
 
-        attr = node.get_attr('name')
-        if attr:
-            for target in self.names:
-                if attr == target:
-                    self.results.append(node)
+        if self.name_ids:
+            id = node.get_name_id()
+            if id is not None:
+                for target in self.name_ids:
+                    if id == target:
+                        self.results.append(node)
 
-        attr = node.get_attr('type')
-        if attr:
-            for target in self.types:
-                if attr == target:
-                    self.results.append(node)
+        if self.type_ids:
+            id = node.get_type_id()
+            if id is not None:
+                for target in self.type_ids:
+                    if id == target:
+                        self.results.append(node)
 
         attr = node.get_attr('value')
         if attr is not None:
@@ -152,6 +199,66 @@ class NodeFinder(object):
         return
 
 
+# Subtree index of names/types > nodes, added in the same order as NodeFinder._find_outer
+# (single results are saved as the node to reduce memory, as most names only appear once).
+class NodeIndex(object):
+    __slots__ = ['_names', '_types']
+
+    def __init__(self):
+        self._names = {}
+        self._types = {}
+
+    # returns a new index of node's subnodes (not including node), or None if it has unloaded lazy subnodes
+    @staticmethod
+    def build(node):
+        index = NodeIndex()
+        if not index._add_outer(node.get_children()):
+            return None
+        return index
+
+    def _add_outer(self, nodes):
+        if not nodes:
+            return True
+
+        for node in nodes:
+            self._add(self._names, node.get_name_id(), node)
+            self._add(self._types, node.get_type_id(), node)
+
+        for node in nodes:
+            if node.is_lazy():
+                return False
+            if not self._add_outer(node.get_children()):
+                return False
+        return True
+
+    def _add(self, items, key, node):
+        if key is None:
+            return
+        item = items.get(key)
+        if item is None:
+            items[key] = node
+        elif type(item) is list:
+            item.append(node)
+        else:
+            items[key] = [item, node]
+
+    def _get(self, items, keys):
+        if not keys:
+            return []
+        item = items.get(keys[0])
+        if item is None:
+            return []
+        if type(item) is list:
+            return item
+        return [item]
+
+    def get_names(self, name_ids):
+        return self._get(self._names, name_ids)
+
+    def get_types(self, type_ids):
+        return self._get(self._types, type_ids)
+
+
 def node_find(node, name=None, type=None, names=None, types=None, value=None, values=None):
     finder = NodeFinder(name=name, type=type, names=names, types=types)
     return finder.find(node)
@@ -1,4 +1,24 @@
-import os, struct
+import os, struct, mmap
+
+# precompiled codecs (avoids parsing format strings per read)
+_D64LE = struct.Struct('<d')
+_D64BE = struct.Struct('>d')
+_F32LE = struct.Struct('<f')
+_F32BE = struct.Struct('>f')
+_S64LE = struct.Struct('<q')
+_S64BE = struct.Struct('>q')
+_U64LE = struct.Struct('<Q')
+_U64BE = struct.Struct('>Q')
+_S32LE = struct.Struct('<i')
+_S32BE = struct.Struct('>i')
+_U32LE = struct.Struct('<I')
+_U32BE = struct.Struct('>I')
+_S16LE = struct.Struct('<h')
+_S16BE = struct.Struct('>h')
+_U16LE = struct.Struct('<H')
+_U16BE = struct.Struct('>H')
+_S8 = struct.Struct('b')
+_U8 = struct.Struct('B')
 
 class FileReader(object):
 
@@ -6,11 +26,49 @@ class FileReader(object):
         self.file = file
         self.be = False
         self._xorpad = None
+        self.unpackers = None
 
         file.seek(0, os.SEEK_END)
         self.size = file.tell()
         file.seek(0, os.SEEK_SET)
 
+        self._bind_endian()
+
+    # Binds generic readers (u32/f32/etc) to the current endianness, so each read doesn't need to
+    # go through 'if self.be' checks. Also makes a type > reader map for callers that read by type.
+    def _bind_endian(self):
+        if self.be:
+            self.d64 = self.d64be
+            self.f32 = self.f32be
+            self.s64 = self.s64be
+            self.u64 = self.u64be
+            self.s32 = self.s32be
+            self.u32 = self.u32be
+            self.s16 = self.s16be
+            self.u16 = self.u16be
+        else:
+            self.d64 = self.d64le
+            self.f32 = self.f32le
+            self.s64 = self.s64le
+            self.u64 = self.u64le
+            self.s32 = self.s32le
+            self.u32 = self.u32le
+            self.s16 = self.s16le
+            self.u16 = self.u16le
+
+        self.unpackers = {
+            'd64': self.d64,
+            'f32': self.f32,
+            's64': self.s64,
+            'u64': self.u64,
+            's32': self.s32,
+            'u32': self.u32,
+            's16': self.s16,
+            'u16': self.u16,
+            's8': self.s8,
+            'u8': self.u8,
+        }
+
     #def _read_buf(self, offset, type, size):
     #    elem = self.buf[offset:offset+size]
     #    return struct.unpack(type, elem)[0]
@@ -19,18 +77,19 @@ class FileReader(object):
         if not elem or len(elem) != size:
             raise ReaderError("can't read requested 0x%x bytes at 0x%x" % (size, self.current()))
 
-    def __read(self, offset, type, size):
+    def _read(self, offset, codec):
         if offset is not None:
             self.file.seek(offset, os.SEEK_SET)
+        size = codec.size
         elem = self.file.read(size)
         if self._xorpad:
-            elem = self.__unxor(elem, size)
+            elem = self._unxor(elem, self.current() - size)
 
         self._check(elem, size)
 
-        return struct.unpack(type, elem)[0]
+        return codec.unpack(elem)[0]
 
-    def __read_string(self, offset, size):
+    def _read_string(self, offset, size):
         if offset is not None:
             self.file.seek(offset, os.SEEK_SET)
         if size == 0:
@@ -45,7 +104,7 @@ class FileReader(object):
         text = elem.decode('UTF-8')
         return text
 
-    def __bytes(self, offset, size):
+    def _bytes(self, offset, size):
         if offset is not None:
             self.file.seek(offset, os.SEEK_SET)
         elem = self.file.read(size)
@@ -54,8 +113,8 @@ class FileReader(object):
         elem = bytes(elem) #force
         return elem
 
-    def __unxor(self, elem, size):
-        offset = self.current() - size
+    def _unxor(self, elem, offset):
+        size = len(elem)
         xorpad_len = len(self._xorpad)
         if offset >= xorpad_len:
             return elem
@@ -71,113 +130,65 @@ class FileReader(object):
         return elem
 
     def d64le(self, offset = None):
-        return self.__read(offset, '<d', 8)
+        return self._read(offset, _D64LE)
 
     def d64be(self, offset = None):
-        return self.__read(offset, '>d', 8)
-
-    def d64(self, offset = None):
-        if self.be:
-            return self.d64be(offset)
-        else:
-            return self.d64le(offset)
+        return self._read(offset, _D64BE)
 
     def f32le(self, offset = None):
-        return self.__read(offset, '<f', 4)
+        return self._read(offset, _F32LE)
 
     def f32be(self, offset = None):
-        return self.__read(offset, '>f', 4)
-
-    def f32(self, offset = None):
-        if self.be:
-            return self.f32be(offset)
-        else:
-            return self.f32le(offset)
+        return self._read(offset, _F32BE)
 
     def s64le(self, offset = None):
-        return self.__read(offset, '<q', 8)
+        return self._read(offset, _S64LE)
 
     def s64be(self, offset = None):
-        return self.__read(offset, '>q', 8)
+        return self._read(offset, _S64BE)
 
     def u64le(self, offset = None):
-        return self.__read(offset, '<Q', 8)
+        return self._read(offset, _U64LE)
 
     def u64be(self, offset = None):
-        return self.__read(offset, '>Q', 8)
-
-    def s64(self, offset = None):
-        if self.be:
-            return self.s64be(offset)
-        else:
-            return self.s64le(offset)
-
-    def u64(self, offset = None):
-        if self.be:
-            return self.u64be(offset)
-        else:
-            return self.u64le(offset)
+        return self._read(offset, _U64BE)
 
     def s32le(self, offset = None):
-        return self.__read(offset, '<i', 4)
+        return self._read(offset, _S32LE)
 
     def s32be(self, offset = None):
-        return self.__read(offset, '>i', 4)
+        return self._read(offset, _S32BE)
 
     def u32le(self, offset = None):
-        return self.__read(offset, '<I', 4)
+        return self._read(offset, _U32LE)
 
     def u32be(self, offset = None):
-        return self.__read(offset, '>I', 4)
-
-    def s32(self, offset = None):
-        if self.be:
-            return self.s32be(offset)
-        else:
-            return self.s32le(offset)
-
-    def u32(self, offset = None):
-        if self.be:
-            return self.u32be(offset)
-        else:
-            return self.u32le(offset)
+        return self._read(offset, _U32BE)
 
     def s16le(self, offset = None):
-        return self.__read(offset, '<h', 2)
+        return self._read(offset, _S16LE)
 
     def s16be(self, offset = None):
-        return self.__read(offset, '>h', 2)
-
-    def s16(self, offset = None):
-        if self.be:
-            return self.s16be(offset)
-        else:
-            return self.s16le(offset)
+        return self._read(offset, _S16BE)
 
     def u16le(self, offset = None):
-        return self.__read(offset, '<H', 2)
+        return self._read(offset, _U16LE)
 
     def u16be(self, offset = None):
-        return self.__read(offset, '>H', 2)
-
-    def u16(self, offset = None):
-        if self.be:
-            return self.u16be(offset)
-        else:
-            return self.u16le(offset)
+        return self._read(offset, _U16BE)
 
     def s8(self, offset = None):
-        return self.__read(offset, 'b', 1)
+        return self._read(offset, _S8)
 
     def u8(self, offset = None):
-        return self.__read(offset, 'B', 1)
+        return self._read(offset, _U8)
 
     def str(self, size, offset = None):
-        return self.__read_string(offset, size)
+        return self._read_string(offset, size)
 
     def fourcc(self, offset = None):
         #as bytes rather than string to avoid failures on bad data
-        return self.__bytes(offset, 4)
+        return self._bytes(offset, 4)
 
     def gap(self, bytes):
         offset_before = self.current()
@@ -199,7 +210,7 @@ class FileReader(object):
         return self.size
 
     def guess_endian32(self, offset):
-        current = self.file.tell()
+        current = self.current()
         var_le = self.u32le(offset)
         var_be = self.u32be(offset)
 
@@ -207,13 +218,15 @@ class FileReader(object):
             self.be = True
         else:
             self.be = False
-        self.file.seek(current, os.SEEK_SET)
+        self._bind_endian()
+        self.seek(current)
 
     def get_endian_big(self):
         return self.be
 
     def set_endian(self, big_endian):
         self.be = big_endian
+        self._bind_endian()
 
     def is_eof(self):
         return self.current() >= self.size
@@ -227,6 +240,80 @@ class FileReader(object):
     def set_xorpad(self, xorpad):
         self._xorpad = xorpad
 
+    def is_mapped(self):
+        return False
+
+    def close(self):
+        pass
+
+
+# Same as FileReader but maps the whole file and reads from memory with an internal cursor,
+# as doing seek+read per field means a ton of (slow) I/O calls in big banks.
+class FileReaderMmap(FileReader):
+
+    def __init__(self, file):
+        super(FileReaderMmap, self).__init__(file)
+        # fails with empty files, handled externally
+        self._buf = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._pos = 0
+
+    def _check_range(self, offset, size):
+        if offset < 0 or offset + size > self.size:
+            raise ReaderError("can't read requested 0x%x bytes at 0x%x" % (size, offset))
+
+    def _read(self, offset, codec):
+        if offset is not None:
+            self._pos = offset
+        pos = self._pos
+        size = codec.size
+        self._check_range(pos, size)
+        self._pos = pos + size
+
+        if self._xorpad and pos < len(self._xorpad):
+            elem = self._unxor(self._buf[pos:pos+size], pos)
+            return codec.unpack(elem)[0]
+        return codec.unpack_from(self._buf, pos)[0]
+
+    def _read_string(self, offset, size):
+        if offset is not None:
+            self._pos = offset
+        if size == 0:
+            return ""
+        elem = self._bytes(None, size)
+
+        #remove c-string null terminator, .decode() retains it
+        if elem[-1] == 0:
+            elem = elem[:-1]
+        text = elem.decode('UTF-8')
+        return text
+
+    def _bytes(self, offset, size):
+        if offset is not None:
+            self._pos = offset
+        pos = self._pos
+        self._check_range(pos, size)
+        self._pos = pos + size
+
+        return self._buf[pos:pos+size] #bytes copy
+
+    def seek(self, offset):
+        self._pos = offset
+
+    def skip(self, bytes):
+        self._pos += bytes
+
+    def current(self):
+        return self._pos
+
+    def is_mapped(self):
+        return True
+
+    def close(self):
+        # nodes keep a ref to the reader, so release the mapping once done (otherwise file can't be moved in some OSs)
+        if self._buf is not None:
+            self._buf.close()
+            self._buf = None
+
 class ReaderError(Exception):
     def __init__(self, msg):
         super(ReaderError, self).__init__(msg)
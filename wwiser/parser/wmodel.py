@@ -1,6 +1,6 @@
-import os
+import os, threading
 from collections import OrderedDict
-from . import wdefs, wfinder
+from . import wdefs, wfinder, wio, wsymbols
 
 #maybe should be in some enum?
 TYPE_4CC = '4cc'
@@ -42,6 +42,20 @@ TYPES_SIZE = {
     TYPE_STR: -1, #variable
     TYPE_STZ: -1, #variable
 }
+
+# types read as u32
+TYPES_U32 = {TYPE_U32, TYPE_SID, TYPE_TID}
+
+# interned types (see wsymbols)
+SYMBOL_SID = wsymbols.get_symbol(TYPE_SID)
+SYMBOL_TID = wsymbols.get_symbol(TYPE_TID)
+
+# registered upfront, as fields are created with these all the time (including bitN subfields)
+_SYMBOLS_TYPE = {type: wsymbols.get_symbol(type) for type in list(TYPES_SIZE) + ['bit%i' % (i) for i in range(32)]}
+
+# types that may have names
+_SYMBOLS_ID = (SYMBOL_SID, SYMBOL_TID)
+
 #not used ATM, just some (rather obvious) doc
 TYPES_INFO = {
     TYPE_SID: "ShortID (uint32_t)",
@@ -126,6 +140,21 @@ class NodeElement(object):
     def get_name(self):
         return None
 
+    # interned name/type (see wsymbols), for faster comparisons
+    def get_name_id(self):
+        return None
+
+    def get_type_id(self):
+        return None
+
+    # subtree index for finders, if supported
+    def get_find_index(self):
+        return None
+
+    # node has children pending to be read (see NodeLazyObject)
+    def is_lazy(self):
+        return False
+
 
     def get_error_count(self):
         return self._error_count
@@ -147,7 +176,7 @@ class NodeElement(object):
 
 # root node with special definitions (represents a bank)
 class NodeRoot(NodeElement):
-    __slots__ = ['__r', '__filename', '__path', '_version', '_id', '_lang', '_feedback', '_custom', '_subversion', '_names', '_strings']
+    __slots__ = ['__r', '__filename', '__path', '_version', '_id', '_lang', '_feedback', '_custom', '_subversion', '_names', '_strings', '_defs', '_lazy', '_skip_items', '_item_sink', '_hirc_items', '_media_items']
 
     def __init__(self, r, version=0):
         super(NodeRoot, self).__init__(None, 'root')
@@ -163,6 +192,12 @@ class NodeRoot(NodeElement):
         self._custom = False
         self._names = None
         self._strings = []
+        self._defs = None
+        self._lazy = False
+        self._skip_items = False
+        self._item_sink = None
+        self._hirc_items = []
+        self._media_items = []
 
 
     # *** inheritance ***
@@ -216,6 +251,12 @@ class NodeRoot(NodeElement):
     def set_id(self, id):
         self._id = id
 
+    def get_defs(self):
+        return self._defs
+
+    def set_defs(self, defs):
+        self._defs = defs
+
     def get_subversion(self):
         return self._subversion
 
@@ -243,26 +284,68 @@ class NodeRoot(NodeElement):
     def set_names(self, names):
         self._names = names
 
+    # HIRC items registered while parsing, so users don't need to find them in the tree
+    # (nsid is the sid field, not set in lazy items as it's replaced once loaded)
+    def add_hirc_item(self, sid, hirc_type, node, offset, nsid=None):
+        self._hirc_items.append((sid, (hirc_type, node, offset, nsid)))
+
+    # list of (sid, (hirc type, node, offset, sid field)) in bank order (sid may be None in bad items)
+    def get_hirc_items(self):
+        return self._hirc_items
+
+    # DIDX entries registered while parsing
+    def add_media_item(self, sid, index):
+        self._media_items.append((sid, index))
+
+    # list of (sid, index) in bank order
+    def get_media_items(self):
+        return self._media_items
+
     def is_be(self):
         return self.__r.get_endian_big()
 
+    # some objects are read on demand (needs reader open)
+    def set_lazy_items(self, flag):
+        self._lazy = flag
+
+    def has_lazy_items(self):
+        return self._lazy
+
+    # HIRC items aren't read (chunk is skipped), for banks that only need header/names info
+    def set_skip_items(self, flag):
+        self._skip_items = flag
+
+    def has_skip_items(self):
+        return self._skip_items
+
+    # HIRC items are passed to callback(node) once read, then discarded rather than kept in the tree
+    def set_item_sink(self, callback):
+        self._item_sink = callback
+
+    def get_item_sink(self):
+        return self._item_sink
+
+    def close(self):
+        self.__r.close()
+
 
 # logical node container of other nodes, with data reading helpers (represents a class)
 class NodeObject(NodeElement):
-    __slots__ = ['__r', '__name', 'lastval', '_index']
+    __slots__ = ['__r', '__name', 'lastval', '_index', '_findex']
 
     def __init__(self, parent, r, name):
         super(NodeObject, self).__init__(parent, 'object')
         self.__r = r
-        self.__name = name
+        self.__name = wsymbols.get_symbol(name)
         self._index = None
         self.lastval = None
+        self._findex = None
 
     # *** inheritance ***
 
     def get_attrs(self):
         attrs = OrderedDict([
-            ('name', self.__name),
+            ('name', self.__name.name),
         ])
         if self._index is not None:
             attrs['index'] = self._index
@@ -270,21 +353,36 @@ class NodeObject(NodeElement):
 
     def get_attr(self, attr):
         if attr == 'name':
-            return self.__name
+            return self.__name.name
         if attr == 'index':
             return self._index
         return None
 
     def get_name(self):
+        return self.__name.name
+
+    def get_name_id(self):
         return self.__name
 
     # changes name, mainly to alter subclasses
     def set_name(self, name):
-        self.__name = name
+        self.__name = wsymbols.get_symbol(name)
 
     def get_index(self):
         return self._index
 
+    # Subtree index for finds, for callers that make lots of finds on the same object (like the
+    # generator when building a HIRC item). Takes a fair amount of memory so it should be removed
+    # once done. Loads lazy objects.
+    def set_find_index(self, flag):
+        findex = None
+        if flag:
+            findex = wfinder.NodeIndex.build(self)
+        self._findex = findex
+
+    def get_find_index(self):
+        return self._findex
+
     # *** node helpers ***
 
     def four(self, name):
@@ -373,32 +471,18 @@ class NodeObject(NodeElement):
                 raise ParseError("error reading past object (offset %08x + read %x)" % (offset, read_size), self)
 
         if value is None:
-            if   type == TYPE_4CC:
-                value = r.fourcc()
-            elif type == TYPE_S64:
-                value = r.s64()
-            elif type == TYPE_U64:
-                value = r.u64()
-            elif type == TYPE_S32:
-                value = r.s32()
-            elif type == TYPE_U32 or type == TYPE_SID or type == TYPE_TID:
+            # most common types first, using reader's endian-bound unpackers (faster than going through the chain)
+            if type in TYPES_U32:
                 value = r.u32()
                 if value == 0xFFFFFFFF:
                     value = -1 #clearly show (happens in rare cases)
-            elif type == TYPE_S16:
-                value = r.s16()
-            elif type == TYPE_U16:
-                value = r.u16()
-            elif type == TYPE_S8:
-                value = r.s8()
-            elif type == TYPE_U8:
-                value = r.u8()
-                #if value == 0xFF:
+            elif type in r.unpackers:
+                value = r.unpackers[type]()
+                #if type == TYPE_U8 and value == 0xFF:
                 #    value = -1
-            elif type == TYPE_F32:
-                value = r.f32()
-            elif type == TYPE_D64:
-                value = r.d64()
+
+            elif type == TYPE_4CC:
+                value = r.fourcc()
 
             elif type == TYPE_STR:
                 if size > 255:
@@ -459,8 +543,8 @@ class NodeObject(NodeElement):
         return child
 
     # register and add a list node and return iterator with new nodes
-    def list(self, name, subname, count):
-        child = NodeList(self, name)
+    def list(self, name, subname, count, lazy=False):
+        child = NodeList(self, name, count)
         self.append(child)
 
         # usually will fail by reading past object but in rare cases can generate too many fields
@@ -468,7 +552,7 @@ class NodeObject(NodeElement):
             raise ParseError("unlikely count %s" % count, self)
         if subname is None:
             subname = name
-        return NodeListIterator(child, self.__r, subname, count)
+        return NodeListIterator(child, self.__r, subname, count, lazy=lazy)
 
     # register a list with items
     def items(self, name, items):
@@ -537,39 +621,174 @@ class NodeObject(NodeElement):
         #TODO improve
         return (omax, offset)
 
+    def get_reader(self):
+        return self.__r
+
+
+_LAZY_LOADING = 1
+_lazy_lock = threading.RLock() #materialization moves the shared reader, viewer may call from threads
+
+_HEADER_READING = 1
+_HEADER_ID = 2 #stops on next read
+
+# signals the parser function got past the ID when reading a lazy object's header
+class _LazyHeaderDone(Exception):
+    pass
+
+# Object whose main data is read on first access to children. Some fields (header) are read as usual,
+# then the rest is skipped and read later by a parser function. Data after the header may be read
+# in the first pass too (like the ID) but it's discarded and read again by the parser function.
+class NodeLazyObject(NodeObject):
+    __slots__ = ['_lazy', '_header']
+
+    def __init__(self, parent, r, name):
+        super(NodeLazyObject, self).__init__(parent, r, name)
+        self._lazy = None
+        self._header = None
+
+    # marks current offset as the start of the lazy data, to be read with reader_fn(self) later
+    def lazy(self, reader_fn):
+        header_count = 0
+        if self._children:
+            header_count = len(self._children)
+        self._lazy = (self.get_reader().current(), reader_fn, header_count)
+        return self
+
+    # reads data after the header with the parser function until it gets past the first ID,
+    # so name and ID are set the same as once loaded (must be called after lazy)
+    def lazy_header(self):
+        _, reader_fn, _ = self._lazy
+        self._header = _HEADER_READING
+        try:
+            reader_fn(self)
+        except _LazyHeaderDone:
+            pass
+        finally:
+            self._header = None
+        return self
+
+    def _read_header(self, type=None):
+        if self._header == _HEADER_ID:
+            raise _LazyHeaderDone()
+        if type == TYPE_SID:
+            self._header = _HEADER_ID
+
+    def field(self, type, name, value=None, size=None):
+        if self._header:
+            self._read_header(type)
+        return super(NodeLazyObject, self).field(type, name, value=value, size=size)
+
+    def list(self, name, subname, count, lazy=False):
+        if self._header:
+            self._read_header()
+        return super(NodeLazyObject, self).list(name, subname, count, lazy=lazy)
+
+    def items(self, name, items):
+        if self._header:
+            self._read_header()
+        return super(NodeLazyObject, self).items(name, items)
+
+    def node(self, name):
+        if self._header:
+            self._read_header()
+        return super(NodeLazyObject, self).node(name)
+
+    # skips to object's max offset (lazy data is read later)
+    def lazy_skip(self):
+        if self._omax is None:
+            raise ValueError("lazy skip without size")
+        self.get_reader().seek(self._omax)
+        return self
+
+    def is_lazy(self):
+        return self._lazy is not None
+
+    # fields read so far (header + provisional ID), without loading the rest
+    def get_loaded_children(self):
+        lazy = self._lazy
+        if lazy is None or lazy == _LAZY_LOADING:
+            return self.get_children()
+        return self._children or []
+
+    def get_children(self):
+        if self._lazy is not None:
+            self._materialize()
+        return self._children
+
+    def _materialize(self):
+        with _lazy_lock:
+            lazy = self._lazy
+            if lazy is None or lazy == _LAZY_LOADING: #done in another thread or called while loading
+                return
+            self._lazy = _LAZY_LOADING
+
+            offset, reader_fn, header_count = lazy
+            r = self.get_reader()
+            current = r.current()
+
+            if self._children:
+                del self._children[header_count:]
+            r.seek(offset)
+            # same as regular parsing, but reader errors can't stop the bank at this point
+            try:
+                try:
+                    reader_fn(self)
+                except ParseError as e:
+                    self.add_error(str(e))
+                self.consume()
+            except (wio.ReaderError, ValueError) as e:
+                self.add_error(str(e))
+                self.get_root()._error_count += 1
+
+            r.seek(current)
+            self._lazy = None
+
 
 # simple subnode container (represents an array)
 class NodeList(NodeElement):
-    __slots__ = ['__name']
+    __slots__ = ['__name', '_expected', '_discarded']
 
-    def __init__(self, parent, name):
+    def __init__(self, parent, name, expected=0):
         super(NodeList, self).__init__(parent, 'list')
-        self.__name = name
+        self.__name = wsymbols.get_symbol(name)
+        self._expected = expected
+        self._discarded = 0
 
     # *** inheritance ***
 
     def get_attrs(self):
-        count = 0
-        if self._children:
-            count = len(self._children)
-
         attrs = OrderedDict([
-            ('name', self.__name),
-            ('count', count),
+            ('name', self.__name.name),
+            ('count', self._get_count()),
         ])
         return attrs
 
     def get_attr(self, attr):
         if attr == 'name':
-            return self.__name
+            return self.__name.name
         if attr == 'count':
-            count = 0
-            if self._children:
-                count = len(self._children)
-            return count
+            return self._get_count()
         return None
 
+    def _get_count(self):
+        count = self._discarded
+        if self._children:
+            count += len(self._children)
+        return count
+
+    # count read from data (same as final count unless parsing fails)
+    def get_expected_count(self):
+        return self._expected
+
+    # removes a child that was already handled (see NodeRoot.set_item_sink), but still counts it
+    def discard(self, node):
+        self._children.remove(node)
+        self._discarded += 1
+
     def get_name(self):
+        return self.__name.name
+
+    def get_name_id(self):
         return self.__name
 
 
@@ -580,8 +799,11 @@ class NodeField(NodeElement):
     def __init__(self, parent, offset, type, name, value):
         super(NodeField, self).__init__(parent, 'field')
         self.__offset = offset
-        self.__type = type
-        self.__name = name
+        symbol = _SYMBOLS_TYPE.get(type)
+        if symbol is None:
+            symbol = wsymbols.get_symbol(type)
+        self.__type = symbol
+        self.__name = wsymbols.get_symbol(name)
         self.__value = value
         self.__fmt = None
         self.__hashtype = False
@@ -593,13 +815,13 @@ class NodeField(NodeElement):
         attrs = OrderedDict()
         if self.__offset:
             attrs['offset'] = self.__offset
-        attrs['type'] = self.__type
-        attrs['name'] = self.__name
+        attrs['type'] = self.__type.name
+        attrs['name'] = self.__name.name
         attrs['value'] = self.__value
         if self.__fmt:
-            attrs['valuefmt'] = self.__fmt.format(self.__type, self.__value)
+            attrs['valuefmt'] = self.__fmt.format(self.__type.name, self.__value)
 
-        if self.__type in [TYPE_SID, TYPE_TID]:
+        if self.__type in _SYMBOLS_ID:
             row = self._get_namerow()
             if row:
                 if row.hashname and self.__hashtype != wdefs.fnv_no:
@@ -617,14 +839,14 @@ class NodeField(NodeElement):
         if attr == 'offset':
             return self.__offset
         if attr == 'type':
-            return self.__type
+            return self.__type.name
         if attr == 'name':
-            return self.__name
+            return self.__name.name
         if attr == 'value':
             return self.__value
         if attr == 'valuefmt':
             if self.__fmt:
-                return self.__fmt.format(self.__type, self.__value)
+                return self.__fmt.format(self.__type.name, self.__value)
             return None
         if attr == 'hashname':
             row = self._get_namerow()
@@ -638,22 +860,35 @@ class NodeField(NodeElement):
         return None
 
     def get_name(self):
+        return self.__name.name
+
+    def get_name_id(self):
         return self.__name
 
+    def get_type_id(self):
+        return self.__type
+
     def _get_namerow(self):
         # row in cache
-        if self.__row is not None:
-            return self.__row
-
-        # signal "tried to load but no results" by default
-        self.__row = False
+        row = self.__row
+        if row is not None and row.__class__ is not int:
+            return row
 
         names = self.get_root()._names
-        if names:
-            row = names.get_namerow(self.__value, hashtype=self.__hashtype, node=self)
-            if row:
-                self.__row = row
-        return self.__row
+        if not names:
+            return False
+
+        # signal "tried to load but no results" with the names' generation, to retry once more are loaded
+        generation = names.get_generation()
+        if row == generation:
+            return False
+        self.__row = generation
+
+        row = names.get_namerow(self.__value, hashtype=self.__hashtype, node=self)
+        if not row:
+            return False
+        self.__row = row
+        return row
 
     # *** node helpers ***
 
@@ -746,14 +981,17 @@ class NodeError(NodeElement):
 # This delayed creation is needed b/c objs set current offset, and it only
 # makes sense after previous object is first read
 class NodeListIterator:
-    __slots__ = ['__parent', '__r', '__subname', '__subname', '__index', '__count', '__list']
+    __slots__ = ['__parent', '__r', '__subname', '__subname', '__index', '__count', '__list', '__cls']
 
-    def __init__(self, parent, r, subname, count):
+    def __init__(self, parent, r, subname, count, lazy=False):
         self.__parent = parent
         self.__r = r
         self.__subname = subname
         self.__index = 0
         self.__count = count
+        self.__cls = NodeObject
+        if lazy:
+            self.__cls = NodeLazyObject
 
     def __iter__(self):
         self.__index = 0
@@ -774,7 +1012,7 @@ class NodeListIterator:
         #if self.__index < len(self.__list):
         #    return self.__list[self.__index]
 
-        obj = NodeObject(self.__parent, self.__r, self.__subname)
+        obj = self.__cls(self.__parent, self.__r, self.__subname)
         obj._index = self.__index
 
         #self.__list.append(obj)
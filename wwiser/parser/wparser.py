@@ -21,6 +21,11 @@ def get_version(obj):
     root = obj.get_root()
     return root.get_version()
 
+# version-dependent definitions (see wdefs.VersionDefs)
+def get_defs(obj):
+    root = obj.get_root()
+    return root.get_defs()
+
 def has_feedback(obj):
     root = obj.get_root()
     return root.has_feedback()
@@ -73,7 +78,7 @@ def AkPropBundle_float_unsigned_short___SetInitialParams(obj, cls):
     obj.u16('cProps')
     elems = obj.list('pProps', 'AkPropBundle', obj.lastval).preload()
     for elem in elems:
-        elem.U16('pID').fmt(wdefs.AkRTPC_ParameterID) #not a AkPropID (states-params are like mini-RTPCs)
+        elem.U16('pID').fmt(get_defs(obj).AkRTPC_ParameterID) #not a AkPropID (states-params are like mini-RTPCs)
     for elem in elems:
         elem.f32('pValue')
 
@@ -93,7 +98,7 @@ def AkPropBundle_float___SetInitialParams(obj, cls):
     obj.u8i('cProps')
     elems = obj.list('pProps', 'AkPropBundle', obj.lastval).preload()
     for elem in elems:
-        elem.U8x('pID').fmt(wdefs.AkRTPC_ParameterID) #not a AkPropID (states-params are like mini-RTPCs)
+        elem.U8x('pID').fmt(get_defs(obj).AkRTPC_ParameterID) #not a AkPropID (states-params are like mini-RTPCs)
     for elem in elems:
         elem.f32('pValue')
 
@@ -113,10 +118,10 @@ def AkPropBundle_AkPropValue_unsigned_char___SetInitialParams(obj, cls, modulato
     obj = obj.node('AkPropBundle<AkPropValue,unsigned char>') #AkPropBundle
 
     if modulator:
-        prop_fmt = wdefs.AkModulatorPropID
+        prop_fmt = get_defs(obj).AkModulatorPropID
         prop_tids = wdefs.AkModulatorPropID_tids
     else:
-        prop_fmt = wdefs.AkPropID
+        prop_fmt = get_defs(obj).AkPropID
         prop_tids = wdefs.AkPropID_tids
     props = []
 
@@ -151,9 +156,9 @@ def AkPropBundle_RANGED_MODIFIERS_AkPropValue__unsigned_char___SetInitialParams(
     obj = obj.node('AkPropBundle<RANGED_MODIFIERS<AkPropValue>>') #AkPropBundle
 
     if modulator:
-        prop_fmt = wdefs.AkModulatorPropID
+        prop_fmt = get_defs(obj).AkModulatorPropID
     else:
-        prop_fmt = wdefs.AkPropID
+        prop_fmt = get_defs(obj).AkPropID
 
     obj.u8i('cProps')
     elems = obj.list('pProps', 'AkPropBundle', obj.lastval).preload()
@@ -182,9 +187,9 @@ def CAkBankMgr__LoadSource(obj, cls, subnode=False):
     PluginType = (plugin_id & 0x0F)
 
     if   cls.version <= 89:
-        obj.U32('StreamType').fmt(wdefs.AkBank__AKBKSourceType)
+        obj.U32('StreamType').fmt(get_defs(obj).AkBank__AKBKSourceType)
     else:
-        obj.U8x('StreamType').fmt(wdefs.AkBank__AKBKSourceType)
+        obj.U8x('StreamType').fmt(get_defs(obj).AkBank__AKBKSourceType)
     stream_type = obj.lastval
 
 
@@ -512,8 +517,8 @@ def CAkStateAware__ReadStateChunk(obj, cls):
 
     obj.var('ulNumStateProps')
     for elem in obj.list('stateProps', 'AkStatePropertyInfo', obj.lastval):
-        elem.var('PropertyId').fmt(wdefs.AkRTPC_ParameterID) #not a AkPropID (states-params are like mini-RTPCs)
-        elem.U8x('accumType').fmt(wdefs.AkRtpcAccum)
+        elem.var('PropertyId').fmt(get_defs(obj).AkRTPC_ParameterID) #not a AkPropID (states-params are like mini-RTPCs)
+        elem.U8x('accumType').fmt(get_defs(obj).AkRtpcAccum)
         if   cls.version <= 126:
             pass
         else:
@@ -622,27 +627,27 @@ def SetInitialRTPC_CAkParameterNodeBase_(obj, cls, modulator=False):
         if   cls.version <= 89:
             pass
         else:
-            elem.U8x('rtpcType').fmt(wdefs.AkRtpcType)
-            elem.U8x('rtpcAccum').fmt(wdefs.AkRtpcAccum)
+            elem.U8x('rtpcType').fmt(get_defs(obj).AkRtpcType)
+            elem.U8x('rtpcAccum').fmt(get_defs(obj).AkRtpcAccum)
 
         if   cls.version <= 89:
-            elem.U32('ParamID').fmt(wdefs.AkRTPC_ParameterID)
+            elem.U32('ParamID').fmt(get_defs(obj).AkRTPC_ParameterID)
         elif cls.version <= 113:
-            elem.U8x('ParamID').fmt(wdefs.AkRTPC_ParameterID)
+            elem.U8x('ParamID').fmt(get_defs(obj).AkRTPC_ParameterID)
         else:
             if modulator:
                 param_fmt = wdefs.AkRTPC_ModulatorParamID
             else:
-                param_fmt = wdefs.AkRTPC_ParameterID
+                param_fmt = get_defs(obj).AkRTPC_ParameterID
             elem.var('ParamID').fmt(param_fmt)
 
         elem.sid('rtpcCurveID')
 
         if cls.version <= 36: #36=UFC
-            elem.U32('eScaling').fmt(wdefs.AkCurveScaling)
+            elem.U32('eScaling').fmt(get_defs(obj).AkCurveScaling)
             elem.u32('ulSize')
         else: #44=AC2
-            elem.U8x('eScaling').fmt(wdefs.AkCurveScaling)
+            elem.U8x('eScaling').fmt(get_defs(obj).AkCurveScaling)
             elem.u16('ulSize')
         parse_rtpc_graph(elem) #indirectly in _vptr$CAkIndexable + 63
     return
@@ -1292,7 +1297,7 @@ def CAkActionPlay__SetActionParams(obj, cls):
         obj.tid('bankID').fnv(wdefs.fnv_bnk)
 
     if cls.version >= 144:
-        obj.U32('bankType').fmt(wdefs.AkActionType)
+        obj.U32('bankType').fmt(get_defs(obj).AkActionType)
 
     return
 
@@ -1414,9 +1419,9 @@ def CAkBankMgr__ReadAction(obj):
     obj.sid('ulID').fnv(wdefs.fnv_no)
 
     if get_version(obj) <= 56:
-        obj.U32('ulActionType').fmt(wdefs.AkActionType)
+        obj.U32('ulActionType').fmt(get_defs(obj).AkActionType)
     else: #62=Blands2
-        obj.U16('ulActionType').fmt(wdefs.AkActionType)
+        obj.U16('ulActionType').fmt(get_defs(obj).AkActionType)
 
     cls = wcls.CAkAction__Create(obj, obj.lastval)
     obj.set_name(cls.name)
@@ -1934,7 +1939,7 @@ def CAkBus__SetInitialValues(obj, cls):
         if cls.version <= 65: #65=DmC
             pass
         else:
-            elem.U8x('TargetProp').fmt(wdefs.AkPropID)
+            elem.U8x('TargetProp').fmt(get_defs(obj).AkPropID)
 
     cls.CAkClass__SetInitialFxParams(obj, cls) #_vptr$CAkIndexable + 71 (v135<=), _vptr$IAkEffectSlotsOwner + 70
 
@@ -2006,7 +2011,7 @@ def CAkLayer__SetInitialValues(obj, cls):
     if cls.version <= 89:
         pass
     else:
-        obj.U8x('rtpcType').fmt(wdefs.AkRtpcType)
+        obj.U8x('rtpcType').fmt(get_defs(obj).AkRtpcType)
 
     if cls.version <= 56:
         obj.f32('fCrossfadingRTPCDefaultValue')
@@ -2259,7 +2264,7 @@ def CAkMusicTrack__SetInitialValues(obj, cls):
         obj.u32('numClipAutomationItem')
         for elem in obj.list('pItems', 'AkClipAutomation', obj.lastval):
             elem.u32('uClipIndex')
-            elem.U32('eAutoType').fmt(wdefs.AkClipAutomationType)
+            elem.U32('eAutoType').fmt(get_defs(obj).AkClipAutomationType)
             elem.u32('uNumPoints')
             parse_rtpc_graph(elem, name='pArrayGraphPoints')
 
@@ -2774,10 +2779,10 @@ def CAkAttenuation__SetInitialValues(obj, cls):
 
     for elem in obj.list('curves', 'CAkConversionTable', obj.lastval):
         if cls.version <= 36: #36=UFC
-            elem.U32('eScaling').fmt(wdefs.AkCurveScaling)
+            elem.U32('eScaling').fmt(get_defs(obj).AkCurveScaling)
             elem.u32('ulSize')
         else:
-            elem.U8x('eScaling').fmt(wdefs.AkCurveScaling)
+            elem.U8x('eScaling').fmt(get_defs(obj).AkCurveScaling)
             elem.u16('ulSize')
         parse_rtpc_graph(elem)
 
@@ -2954,17 +2959,17 @@ def CAkFxBase__SetInitialValues(obj, cls):
         obj.u16('ulNumInit')
         for elem in obj.list('rtpcinit', 'RTPCInit', obj.lastval):
             if cls.version <= 113:
-                elem.U8x('ParamID').fmt(wdefs.AkRTPC_ParameterID)
+                elem.U8x('ParamID').fmt(get_defs(obj).AkRTPC_ParameterID)
             else:
-                elem.var('ParamID').fmt(wdefs.AkRTPC_ParameterID)
+                elem.var('ParamID').fmt(get_defs(obj).AkRTPC_ParameterID)
             elem.f32('fInitValue')
     else:
         cls.CAkClass__ReadStateChunk(obj, cls)
 
         obj.u16('numValues')
         for elem in obj.list('propertyValues', 'PluginPropertyValue', obj.lastval):
-            elem.var('propertyId').fmt(wdefs.AkRTPC_ParameterID)
-            elem.U8x('rtpcAccum').fmt(wdefs.AkRtpcAccum)
+            elem.var('propertyId').fmt(get_defs(obj).AkRTPC_ParameterID)
+            elem.U8x('rtpcAccum').fmt(get_defs(obj).AkRtpcAccum)
             elem.f32('fValue')
 
     return
@@ -3166,6 +3171,57 @@ def get_hirc_dispatch(obj):
 
     return hirc_dispatch
 
+# HIRC items that can be read on demand (lazy mode). Events/actions/states are small (and used to start
+# reading other items) so they are always read.
+def get_hirc_lazy_readers():
+    hirc_lazy_readers = {
+        CAkBankMgr__ReadSourceParent_CAkSound_,
+        CAkBankMgr__StdBankRead_CAkRanSeqCntr_CAkParameterNodeBase_,
+        CAkBankMgr__StdBankRead_CAkSwitchCntr_CAkParameterNodeBase_,
+        CAkBankMgr__StdBankRead_CAkActorMixer_CAkParameterNodeBase_,
+        CAkBankMgr__ReadBus,
+        CAkBankMgr__StdBankRead_CAkLayerCntr_CAkParameterNodeBase_,
+        CAkBankMgr__StdBankRead_CAkMusicSegment_CAkParameterNodeBase_,
+        CAkBankMgr__ReadSourceParent_CAkMusicTrack_,
+        CAkBankMgr__StdBankRead_CAkMusicSwitchCntr_CAkParameterNodeBase_,
+        CAkBankMgr__StdBankRead_CAkMusicRanSeqCntr_CAkParameterNodeBase_,
+        CAkBankMgr__StdBankRead_CAkAttenuation_CAkAttenuation_,
+        CAkBankMgr__StdBankRead_CAkDialogueEvent_CAkDialogueEvent_,
+        CAkBankMgr__StdBankRead_CAkFeedbackBus_CAkParameterNodeBase_,
+        CAkBankMgr__ReadSourceParent_CAkFeedbackNode_,
+        CAkBankMgr__StdBankRead_CAkFxShareSet_CAkFxShareSet_,
+        CAkBankMgr__StdBankRead_CAkFxCustom_CAkFxCustom_,
+        CAkBankMgr__StdBankRead_CAkAuxBus_CAkParameterNodeBase_,
+        CAkBankMgr__StdBankRead_CAkLFOModulator_CAkModulator_,
+        CAkBankMgr__StdBankRead_CAkEnvelopeModulator_CAkModulator_,
+        CAkBankMgr__StdBankRead_CAkAudioDevice_CAkAudioDevice_,
+        CAkBankMgr__StdBankRead_CAkTimeModulator_CAkModulator_,
+    }
+    return hirc_lazy_readers
+
+# item's sid field (same as obj.find1(type='sid'), but doesn't make a find index)
+def get_hirc_nsid(obj):
+    for child in obj.get_children() or []:
+        if child.get_type_id() == wmodel.SYMBOL_SID:
+            return child
+
+    return obj.find1(type='sid')
+
+# reads item's basic info and leaves the rest to be read on first access
+# (with the item's reader, stopped once past the ID), returning the ID
+def parse_hirc_lazy(obj, dispatch):
+    obj.lazy(dispatch)
+    try:
+        obj.lazy_header()
+    except wmodel.ParseError as e:
+        obj.add_error(str(e))
+    obj.lazy_skip()
+
+    for child in obj.get_loaded_children():
+        if child.get_type_id() == wmodel.SYMBOL_SID:
+            return child.value()
+    return None
+
 #026>=
 def CAkBankMgr__ProcessHircChunk(obj):
     #CAkBankMgr::ProcessHircChunk
@@ -3175,27 +3231,56 @@ def CAkBankMgr__ProcessHircChunk(obj):
 
     hirc_dispatch = get_hirc_dispatch(obj)
 
+    lazy = obj.get_root().has_lazy_items()
+    hirc_lazy_readers = set()
+    if lazy:
+        hirc_lazy_readers = get_hirc_lazy_readers()
+
+    root = obj.get_root()
+    sink = root.get_item_sink()
     count = 0
     try:
         obj.u32('NumReleasableHircItem')
-        for elem in obj.list('listLoadedItem', 'AkListLoadedItem', obj.lastval):
+        if root.has_skip_items():
+            omax, _ = obj.offset_info()
+            obj.get_reader().seek(omax)
+            return
+
+        for elem in obj.list('listLoadedItem', 'AkListLoadedItem', obj.lastval, lazy=lazy):
+            offset = elem.get_reader().current()
 
             #AkBank::AKBKSubHircSection
             if version <= 48:
-                elem.U32('eHircType').fmt(wdefs.AkBank__AKBKHircType)
+                elem.U32('eHircType').fmt(get_defs(obj).AkBank__AKBKHircType)
             else:
-                elem.U8x('eHircType').fmt(wdefs.AkBank__AKBKHircType)
+                elem.U8x('eHircType').fmt(get_defs(obj).AkBank__AKBKHircType)
             hirc_type = elem.lastval
             elem.U32('dwSectionSize').omax()
 
             #Section.eHircType switch
+            dispatch = hirc_dispatch.get(hirc_type, parse_hirc_default)
+            if dispatch in hirc_lazy_readers:
+                sid = parse_hirc_lazy(elem, dispatch)
+                root.add_hirc_item(sid, hirc_type, elem, offset)
+                count += 1
+                continue
+
             try:
-                dispatch = hirc_dispatch.get(hirc_type, parse_hirc_default)
                 dispatch(elem)
             except wmodel.ParseError as e:
                 elem.add_error(str(e))
 
             elem.consume()
+            if sink:
+                # handled externally and removed to keep memory low (not registered in root)
+                sink(elem)
+                elem.get_parent().discard(elem)
+                count += 1
+                continue
+
+            nsid = get_hirc_nsid(elem)
+            sid = nsid.value() if nsid else None
+            root.add_hirc_item(sid, hirc_type, elem, offset, nsid)
             count += 1
 
     except wio.ReaderError as e:
@@ -3411,13 +3496,13 @@ def CAkBankMgr__ProcessFxParamsChunk(obj):
                 elem2.U32('pBufferToFill')
                 elem2.u8i('uFXIndex')
             elem2.tid('RTPCID').fnv(wdefs.fnv_gmx) #depends on target (ex. modulator=guidname, curve=hashname)
-            elem2.U32('ParamID').fmt(wdefs.AkRTPC_ParameterID)
+            elem2.U32('ParamID').fmt(get_defs(obj).AkRTPC_ParameterID)
             elem2.sid('rtpcCurveID') #fnv?
             if version <= 34: #34=LOTR (probably for 36 too since other parts need it
-                elem2.u32('eScaling').fmt(wdefs.AkCurveScaling)
+                elem2.u32('eScaling').fmt(get_defs(obj).AkCurveScaling)
                 elem2.u32('ulSize')
             else:
-                elem2.U8x('eScaling').fmt(wdefs.AkCurveScaling)
+                elem2.U8x('eScaling').fmt(get_defs(obj).AkCurveScaling)
                 elem2.u16('ulSize')
             parse_rtpc_graph(elem2)
 
@@ -3576,9 +3661,9 @@ def CAkBankMgr__ProcessGlobalSettingsChunk(obj):
                 elem2.tid('ulStateType') #ulStateID
 
                 if version <= 48:
-                    elem2.u32('eHircType').fmt(wdefs.AkBank__AKBKHircType)
+                    elem2.u32('eHircType').fmt(get_defs(obj).AkBank__AKBKHircType)
                 else:
-                    elem2.U8x('eHircType').fmt(wdefs.AkBank__AKBKHircType)
+                    elem2.U8x('eHircType').fmt(get_defs(obj).AkBank__AKBKHircType)
                 elem2.u32('dwSectionSize')
 
                 obj_state = elem2.node('state')
@@ -3599,7 +3684,7 @@ def CAkBankMgr__ProcessGlobalSettingsChunk(obj):
         if version <= 89:
             pass
         else:
-            elem.U8x('rtpcType').fmt(wdefs.AkRtpcType)
+            elem.U8x('rtpcType').fmt(get_defs(obj).AkRtpcType)
         elem.u32('ulSize')
         parse_rtpc_graph(elem, name='pSwitchMgr', subname='AkSwitchGraphPoint')
 
@@ -3619,7 +3704,7 @@ def CAkBankMgr__ProcessGlobalSettingsChunk(obj):
             elem.u32('rampType').fmt(wdefs.AkTransitionRampingType)
             elem.f32('fRampUp')
             elem.f32('fRampDown')
-            elem.u8i('eBindToBuiltInParam').fmt(wdefs.AkBuiltInParam)
+            elem.u8i('eBindToBuiltInParam').fmt(get_defs(obj).AkBuiltInParam)
 
     if   version <= 118:
         pass
@@ -3701,10 +3786,10 @@ def CAkBankMgr__ProcessEnvSettingsChunk(obj):
             elem = obj.node('ObsOccCurve[%s][%s]' % (wdefs.eCurveXType.enum[i], wdefs.eCurveYType.enum[j]))
             elem.u8i('bCurveEnabled') #when != 0
             if version <= 36: #36=UFC
-                elem.u32('eCurveScaling').fmt(wdefs.AkCurveScaling)
+                elem.u32('eCurveScaling').fmt(get_defs(obj).AkCurveScaling)
                 elem.u32('ulCurveSize')
             else:
-                elem.u8i('eCurveScaling').fmt(wdefs.AkCurveScaling)
+                elem.u8i('eCurveScaling').fmt(get_defs(obj).AkCurveScaling)
                 elem.u16('ulCurveSize')
             parse_rtpc_graph(elem, name='aPoints', subname='AkRTPCGraphPoint')
     return
@@ -3719,9 +3804,11 @@ def CAkBankMgr__LoadMediaIndex(obj):
     obj.set_name('MediaIndex')
     chunk_size = obj.lastval
 
+    root = obj.get_root()
     uNumMedias = chunk_size // 0x0c
     for elem in obj.list('pLoadedMedia', 'MediaHeader', uNumMedias):
         elem.sid('id').fnv(wdefs.fnv_no)
+        root.add_media_item(elem.lastval, elem.get_index())
         elem.U32('uOffset')
         elem.U32('uSize')
     return
@@ -3841,6 +3928,9 @@ class Parser(object):
         #self._ignore_version = ignore_version
         self._banks = {}
         self._names = None
+        self._lazy = False
+        self._skip_items = False
+        wcls.setup()
 
 
     def _check_header(self, r, bank):
@@ -3906,8 +3996,7 @@ class Parser(object):
 
         r.seek(current)
 
-        wdefs.setup(version)
-        wcls.setup()
+        root.set_defs(wdefs.get_defs(version))
         return version
 
     def parse_banks(self, filenames):
@@ -3932,9 +4021,16 @@ class Parser(object):
         try:
             with open(filename, 'rb') as infile:
                 #real_filename = infile.name
-                r = wio.FileReader(infile)
-                r.guess_endian32(0x04)
-                res = self._process(r, filename)
+                r = self._get_reader(infile)
+                lazy = self._lazy and r.is_mapped() #mmap stays valid after closing the file
+                keep_open = False
+                try:
+                    r.guess_endian32(0x04)
+                    res = self._process(r, filename, lazy)
+                    keep_open = lazy and not res
+                finally:
+                    if not keep_open:
+                        r.close()
 
             if res:
                 logging.info("parser: %s", res)
@@ -3952,6 +4048,47 @@ class Parser(object):
 
         return None
 
+    # Parses a bank again, passing each HIRC item to callback(node) as it's read, then discarding it.
+    # Meant to process huge banks with constant-ish memory (other chunks are kept as usual).
+    # Bank isn't registered and the callback may be called before an error aborts parsing.
+    def stream_bank(self, filename, callback):
+        logging.info("parser: streaming %s", filename)
+
+        try:
+            with open(filename, 'rb') as infile:
+                r = self._get_reader(infile)
+                try:
+                    r.guess_endian32(0x04)
+                    bank = wmodel.NodeRoot(r)
+                    bank.set_item_sink(callback)
+                    if self._names:
+                        bank.set_names(self._names)
+                    res = self._read_bank(r, bank)
+                finally:
+                    r.close()
+
+            if res:
+                logging.info("parser: %s", res)
+                return None
+
+            logging.debug("parser: done %s", filename)
+            return bank
+
+        except wio.ReaderError as e:
+            error_info = self._print_errors(e)
+            logging.error("parser: error parsing %s (corrupted file?), error:\n%s" % (filename, error_info))
+        except Exception as e:
+            logging.error("parser: error parsing " + filename, e)
+
+        return None
+
+    # memory-mapped reader is much faster, but can't map empty/special files
+    def _get_reader(self, infile):
+        try:
+            return wio.FileReaderMmap(infile)
+        except (ValueError, OSError):
+            return wio.FileReader(infile)
+
     def _print_errors(self, e):
         import traceback
 
@@ -3971,9 +4108,28 @@ class Parser(object):
         text = '\n'.join(info)
         return text
 
-    def _process(self, r, filename):
+    def _process(self, r, filename, lazy=False):
         bank = wmodel.NodeRoot(r)
+        bank.set_lazy_items(lazy)
+        bank.set_skip_items(self._skip_items)
+
+        res = self._read_bank(r, bank)
+        if res:
+            return res
+
+        if self._names:
+            bank.set_names(self._names)
+
+        root = bank.get_root()
+        sid = root.get_id()
+        lang = root.get_lang()
+        size = r.get_size()
 
+        self._banks[filename] = (bank, sid, lang, size)
+        return None
+
+    # reads all chunks, returns error message if bank can't be read
+    def _read_bank(self, r, bank):
         try:
             version = self._check_header(r, bank)
 
@@ -3996,16 +4152,6 @@ class Parser(object):
             logging.info("parser: ERRORS! %i found (report issue)" % bank.get_error_count())
         if bank.get_skip_count() > 0:
             logging.info("parser: SKIPS! %i found (report issue)" % bank.get_skip_count())
-
-        if self._names:
-            bank.set_names(self._names)
-
-        root = bank.get_root()
-        sid = root.get_id()
-        lang = root.get_lang()
-        size = r.get_size()
-
-        self._banks[filename] = (bank, sid, lang, size)
         return None
 
     def get_banks(self, mode=None):
@@ -4078,12 +4224,23 @@ class Parser(object):
     def get_filenames(self):
         return list(self._banks.keys())
 
+    def get_names(self):
+        return self._names
+
     def set_names(self, names):
         self._names = names
         for items in self._banks.values():
             bank = items[0]
             bank.set_names(names)
 
+    # read some HIRC items on first access (saves time/memory when only some items are used)
+    def set_lazy(self, flag):
+        self._lazy = flag
+
+    # don't read HIRC items (for banks that are streamed later, see stream_bank)
+    def set_skip_items(self, flag):
+        self._skip_items = flag
+
     #def set_ignore_version(self, value):
     #    self._ignore_version = value
 
@@ -4093,4 +4250,6 @@ class Parser(object):
             return
 
         logging.info("parser: unloading " + filename)
-        self._banks.pop(filename)
+        items = self._banks.pop(filename)
+        bank = items[0]
+        bank.close()
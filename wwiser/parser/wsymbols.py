@@ -0,0 +1,39 @@
+import threading
+
+# Interned node names/types. Each distinct string (like 'ulID' or 'listLoadedItem') maps to a single
+# Symbol, a small int that also keeps its name, so nodes store a ref to a shared object and finders
+# can compare ints rather than strings.
+#
+# Ids depend on the order names are registered, so they are only valid in the current process.
+
+class Symbol(int):
+
+    def __new__(cls, id, name):
+        obj = super(Symbol, cls).__new__(cls, id)
+        obj.name = name
+        return obj
+
+    def __repr__(self):
+        return 'Symbol(%i, %r)' % (int(self), self.name)
+
+
+_symbols = []
+_symbol_names = {}
+_lock = threading.Lock()
+
+# returns name's symbol, registering it if needed
+def get_symbol(name):
+    # symbols hash as ints so they never match str keys, checked after as most calls pass names
+    symbol = _symbol_names.get(name)
+    if symbol is not None:
+        return symbol
+    if type(name) is Symbol:
+        return name
+
+    with _lock:
+        symbol = _symbol_names.get(name)
+        if symbol is None:
+            symbol = Symbol(len(_symbols), name)
+            _symbols.append(symbol)
+            _symbol_names[name] = symbol
+    return symbol
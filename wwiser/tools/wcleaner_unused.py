@@ -90,11 +90,8 @@ class CleanerUnused(object):
             for nchunk in root.get_children():
                 chunkname = nchunk.get_name()
                 if chunkname == 'HircChunk':
-                    items = bank.find(name='listLoadedItem')
-                    if not items: # media-only banks don't have items
-                        continue
-
-                    for node in items.get_children():
+                    # media-only banks don't have items
+                    for _, (_, node, _, _) in root.get_hirc_items():
                         self._add_node(node)
 
     def _add_node(self, node):
@@ -5,15 +5,18 @@ function Viewer() {
     this.load_simple = load_simple;
     this.load_simple_all = load_simple_all;
     this.load_node = load_node;
+    this.load_list = load_list;
+    this.search = search;
     this.load_docs_readme = load_docs_readme;
     this.load_docs_wwiser = load_docs_wwiser;
 
 
+    // banks/nodes are loaded as JSON and rendered here (see Renderer)
     function load_banks(on_success) {
-        get_ajax('/load-banks', on_success);
+        get_json('/api/banks', on_success);
     }
     function load_banks_all(on_success) {
-        get_ajax('/load-banks?all=true', on_success);
+        get_json('/api/banks?all=true', on_success);
     }
     function load_simple(on_success) {
         get_ajax('/load-banks?simple=true', on_success);
@@ -25,7 +28,13 @@ function Viewer() {
         get_ajax('/load-banks?all=true&simple=true', on_success);
     }
     function load_node(id, on_success) {
-        get_ajax('/load-node?id='+id, on_success);
+        get_json('/api/node?id='+id, on_success);
+    }
+    function load_list(id, start, on_success) {
+        get_json('/api/list?id='+id+'&start='+start, on_success);
+    }
+    function search(query, on_success) {
+        get_json('/search?q='+encodeURIComponent(query), on_success);
     }
     function load_docs_readme(on_success) {
         get_ajax('/load-docs?doc=readme', on_success);
@@ -34,6 +43,12 @@ function Viewer() {
         get_ajax('/load-docs?doc=wwiser', on_success);
     }
 
+    function get_json(url, on_success, on_error) {
+        get_ajax(url, function(res) {
+            on_success(JSON.parse(res));
+        }, on_error);
+    }
+
     function get_ajax(url, on_success, on_error) {
         var xhr = new XMLHttpRequest();
         xhr.open('GET', url, true);
@@ -59,18 +74,149 @@ function Viewer() {
 }
 
 
+var NODE_EMPTY_MSG = "No nodes found";
+
+// makes html from JSON nodes, same as the server's templates
+function Renderer() {
+    this.render_nodes = render_nodes;
+    this.render_results = render_results;
+
+    // search results, that load their HIRC item (or chunk) on click
+    function render_results(res) {
+        var html = [];
+        for (var i = 0; i < res.results.length; i++) {
+            var result = res.results[i];
+            html.push('<div class="search-result" data-id="'+esc(result.id)+'">');
+            html.push('<span class="attr name">'+esc(result.name)+'</span>');
+            html.push('<span class="attr value">'+esc(result.bank)+' / '+esc(result.match)+'</span>');
+            html.push('</div>');
+        }
+        if (res.results.length == 0)
+            html.push('<div>'+NODE_EMPTY_MSG+'</div>');
+        if (res.more)
+            html.push('<div>(more results found, showing first '+res.results.length+')</div>');
+        return html.join('');
+    }
+
+    function render_nodes(objs) {
+        var html = [];
+        for (var i = 0; i < objs.length; i++) {
+            render_node(objs[i], html);
+        }
+        return html.join('');
+    }
+
+    function esc(value) {
+        return String(value)
+            .replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;')
+            .replace(/"/g, '&quot;').replace(/'/g, '&#39;');
+    }
+
+    function render_body(obj, html) {
+        html.push('<div class="body">');
+        var children = obj.children || [];
+        for (var i = 0; i < children.length; i++) {
+            render_node(children[i], html);
+        }
+        if (obj.more) {
+            html.push('<button class="load-more" data-id="'+obj.id+'" data-start="'+children.length+'">more</button>');
+        }
+        html.push('</div>');
+    }
+
+    function render_closable(obj, html, type, name, value) {
+        var extra = '';
+        if (obj.lazy)
+            extra = ' hidden js-load-node ' + esc(obj.attrs.name);
+        var id = obj.id ? ' data-id="'+obj.id+'"' : '';
+
+        html.push('<div class="'+obj.node+' closable'+extra+'"'+id+'>');
+        html.push('<div class="head">');
+        html.push('<span class="attr type">'+type+'</span>');
+        html.push('<span class="attr name">'+name+'</span>');
+        if (value !== null)
+            html.push('<span class="attr value">'+value+'</span>');
+        html.push('</div>');
+        render_body(obj, html);
+        html.push('</div>');
+    }
+
+    function render_field(obj, html) {
+        var attrs = obj.attrs;
+        html.push('<div class="field">');
+        if ('offset' in attrs) {
+            html.push('<div class="offset">'+('0000000' + attrs.offset.toString(16)).slice(-8)+'</div>');
+        }
+        html.push('<div class="head">');
+        html.push('<span class="attr type">'+esc(attrs.type)+'</span>');
+        html.push('<span class="attr name">'+esc(attrs.name)+'</span>');
+        var value = 'valuefmt' in attrs ? attrs.valuefmt : attrs.value;
+        html.push('<span class="attr value">'+esc(value)+'</span>');
+
+        // clickable links need text nodes, but not anchors
+        if (attrs.type == 'tid' && attrs.value > 0)
+            html.push('<a class="target" href="#'+attrs.value+'">target</a>');
+        if (attrs.type == 'sid')
+            html.push('<a class="anchor" id="'+attrs.value+'" href="#'+attrs.value+'">anchor</a>');
+
+        if ('hashname' in attrs)
+            html.push('<span class="attr hashname">('+esc(attrs.hashname)+')</span>');
+        if ('guidname' in attrs)
+            html.push('<span class="attr guidname">{'+esc(attrs.guidname)+'}</span>');
+        if ('objpath' in attrs)
+            html.push('<span class="tooltip objpath"><span class="attr objpath">'+esc(attrs.objpath)+'</span></span>');
+        if ('path' in attrs)
+            html.push('<span class="tooltip path"><span class="attr path">'+esc(attrs.path)+'</span></span>');
+        html.push('</div>');
+        render_body(obj, html);
+        html.push('</div>');
+    }
+
+    function render_node(obj, html) {
+        var attrs = obj.attrs;
+        switch(obj.node) {
+            case 'root':
+                render_closable(obj, html, 'bank', 'v'+esc(attrs.version), esc(attrs.filename));
+                break;
+            case 'list':
+                render_closable(obj, html, 'list', esc(attrs.name), esc(attrs.count));
+                break;
+            case 'object':
+                var name = esc(attrs.name);
+                if ('index' in attrs)
+                    name += '<span class="index">['+attrs.index+']</span>';
+                render_closable(obj, html, 'obj', name, null);
+                break;
+            case 'field':
+                render_field(obj, html);
+                break;
+            case 'skip':
+                html.push('<div class="skip">(skipped 0x'+attrs.size.toString(16)+')</div>');
+                break;
+            case 'error':
+                html.push('<div class="error">error: '+esc(attrs.message)+'</div>');
+                break;
+            default:
+                html.push('<div class="error">error</div>');
+                break;
+        }
+    }
+}
+
+
 // view namespace
 (function() {
     var NODE_WARNING_MAX = 300;
     var NODE_WARNING_MSG = "Warning! Preload size is big and may be slow/unresponsive!";
-    var NODE_EMPTY_MSG = "No nodes found";
 
     var viewer = new Viewer();
+    var renderer = new Renderer();
 
     var $d = document;
     var $tabs_panel = $d.getElementById('tabs-panel');
     var $tabs = $d.getElementById('tabs');
     var vbank = load_view('tab-bank');
+    var $results = vbank.main.querySelector('.search-results');
     var vsimple = load_view('tab-simple');
     var vdocs_readme = load_view('tab-docs-readme');
     var vdocs_wwiser = load_view('tab-docs-wwiser');
@@ -97,6 +243,8 @@ function Viewer() {
     }
 
     function load_items(view, res) {
+        if (typeof res !== 'string')
+            res = renderer.render_nodes(res);
         view.content.innerHTML = res;
         view.loaded = true;
     }
@@ -181,12 +329,41 @@ function Viewer() {
                 return;
             }
 
+            if (tgt.matches('.search')) {
+                var query = vbank.tools.querySelector('.search-text').value;
+                if (!query)
+                    return;
+                viewer.search(query, function(res) {
+                    $results.innerHTML = renderer.render_results(res);
+                });
+                return;
+            }
+
+            var result = tgt.closest('.search-result');
+            if (result) {
+                viewer.load_node(result.dataset.id, function(res) {
+                    result.outerHTML = renderer.render_nodes([res]);
+                });
+                return;
+            }
+
+            if (tgt.matches('.load-more')) {
+                viewer.load_list(tgt.dataset.id, tgt.dataset.start, function(res) {
+                    tgt.insertAdjacentHTML('beforebegin', renderer.render_nodes(res.children));
+                    if (res.more)
+                        tgt.dataset.start = res.start + res.children.length;
+                    else
+                        tgt.remove();
+                });
+                return;
+            }
+
             if (tgt.matches('.closable > .head')) {
                 var obj = tgt.parentNode;
                 if (obj.matches('.js-load-node')) {
-                    id = obj.dataset.id;
+                    var id = obj.dataset.id;
                     viewer.load_node(id, function(res) {
-                        obj.outerHTML = res;
+                        obj.outerHTML = renderer.render_nodes([res]);
                         //obj.classList.toggle('hidden');
                         //TODO: may need to evict DOM nodes if there are too many open to improve performance
                     });
@@ -1,4 +1,4 @@
-import logging
+import logging, os, json
 from . import wloader
 from ..parser import wmodel
 
@@ -7,6 +7,8 @@ TYPE_TXT = 'txt'
 TYPE_XSL = 'xsl'
 TYPE_XSL_SMALLER = 'xsl_s'
 TYPE_XML = 'xml'
+TYPE_JSON = 'json'
+TYPE_NDJSON = 'ndjson'
 TYPE_EMPTY = 'empty'
 TYPE_NONE = 'none'
 
@@ -35,7 +37,14 @@ class DumpPrinter(object):
         self._formatted = False
         self._smaller = False
         self._hide = False
+        self._parser = None
+        self._frames = None
+        self._seps = None
 
+    # HIRC items are read again from the bank files and printed one at a time as they are parsed,
+    # so memory doesn't grow with the bank (banks can be loaded with parser.set_skip_items)
+    def set_stream(self, parser):
+        self._parser = parser
 
     def dump(self):
         if   self._type == TYPE_TXT:
@@ -46,6 +55,10 @@ class DumpPrinter(object):
             self.write_xsl()
         elif self._type == TYPE_XSL_SMALLER:
             self.write_xsl_smaller()
+        elif self._type == TYPE_JSON:
+            self.write_json()
+        elif self._type == TYPE_NDJSON:
+            self.write_ndjson()
         elif self._type == TYPE_EMPTY:
             self.write_empty()
         elif self._type == TYPE_NONE:
@@ -75,6 +88,14 @@ class DumpPrinter(object):
         self._hide = True
         self.write_xsl()
 
+    def write_json(self):
+        outname  = self._make_name(".json")
+        self._write(outname, self._print_json)
+
+    def write_ndjson(self):
+        outname  = self._make_name(".ndjson")
+        self._write(outname, self._print_ndjson)
+
     def _write(self, outname, callback):
         if not self._banks: #no banks loaded
             return
@@ -114,26 +135,46 @@ class DumpPrinter(object):
             text = wloader.Loader.get_resource_text('resources/stylesheet.1.xsl')
             self._file.write(text)
 
-        # may reimplement this as a stack-based printer rather than recursive calls
-        # but time savings are not too big (~3s for bigger files)
+        # recursive calls, as a stack-based printer with batched writes was slower
         for bank in self._banks:
-            self._print_xml_node(bank, 0)
+            if self._parser:
+                self._print_stream(bank, self._print_xml_node, self._print_xml_open, self._print_xml_close)
+            else:
+                self._print_xml_node(bank, 0)
 
         if self._formatted:
             text = wloader.Loader.get_resource_text('resources/stylesheet.2.xsl')
             self._file.write(text)
 
-    def _print_xml_node(self, node, depth):
-        just = '\t' * depth
-
-        nodename = node.get_nodename()
-        attrs = node.get_attrs().items()
+    def _print_xml_node(self, node, depth, index=None):
         children = node.get_children()
         #text = node.get_text()
         has_children = children and len(children) > 0
 
+        if not has_children:
+            self._print_xml_tag(node, depth, node.get_attrs(), True)
+        else:
+            self._print_xml_tag(node, depth, node.get_attrs(), False)
+
+            for subnode in children:
+                self._print_xml_node(subnode, depth + 1)
+
+            self._print_xml_close(node, depth)
+
+    # streamed lists are opened before reading items, so count is taken from data
+    def _print_xml_open(self, node, depth, index):
+        attrs = node.get_attrs()
+        if isinstance(node, wmodel.NodeList):
+            attrs['count'] = node.get_expected_count()
+        self._print_xml_tag(node, depth, attrs, False)
+        return depth + 1
+
+    def _print_xml_tag(self, node, depth, attrs, closed):
+        just = '\t' * depth
+        nodename = node.get_nodename()
+
         line = ""
-        for key, val in attrs:
+        for key, val in attrs.items():
             if self._hide and key in self.attr_hide:
                 continue
             if self._formatted and key in self.attr_format:
@@ -149,34 +190,51 @@ class DumpPrinter(object):
         if self._smaller and nodename in self.node_smaller:
             nodename = self.node_smaller[nodename]
 
-        if not has_children:
+        if closed:
             line = "%s<%s%s/>\n" % (just, nodename, line)
-            self._file.write(line)
         else:
             line = "%s<%s%s>\n" % (just, nodename, line)
-            self._file.write(line)
+        self._file.write(line)
 
-            depth += 1
-            for subnode in children:
-                self._print_xml_node(subnode, depth)
+    def _print_xml_close(self, node, depth):
+        just = '\t' * depth
+        nodename = node.get_nodename()
+        if self._smaller and nodename in self.node_smaller:
+            nodename = self.node_smaller[nodename]
 
-            line = "%s</%s>\n" % (just, nodename)
-            self._file.write(line)
+        line = "%s</%s>\n" % (just, nodename)
+        self._file.write(line)
 
 
     def _print_txt(self):
         for bank in self._banks:
-            self._print_txt_node(bank, 0, 0)
+            if self._parser:
+                self._print_stream(bank, self._print_txt_node, self._print_txt_line, None)
+            else:
+                self._print_txt_node(bank, 0, 0)
 
     def _print_txt_node(self, node, depth, index):
+        children = node.get_children()
+        #text = node.get_text()
+        has_children = children and len(children) > 0
+
+        depth = self._print_txt_line(node, depth, index)
+
+        if has_children:
+            if   isinstance(node, wmodel.NodeList):
+                for index, subnode in enumerate(children):
+                    self._print_txt_node(subnode, depth, index)
+            else:
+                for subnode in children:
+                    self._print_txt_node(subnode, depth, None)
+
+    # prints node's own line and returns depth for children
+    def _print_txt_line(self, node, depth, index):
         just = ''.ljust(depth)
         ojust = ''.ljust(8)
 
         #nodename = node.get_nodename()
         attrs = node.get_attrs()
-        children = node.get_children()
-        #text = node.get_text()
-        has_children = children and len(children) > 0
 
         line = None
         if   isinstance(node, wmodel.NodeRoot):
@@ -228,12 +286,175 @@ class DumpPrinter(object):
         if line is not None:
             self._file.write(line + '\n')
             depth += 3
+        return depth
 
+    # Whole tree as a list of banks, each node being {"node": nodename, "attrs": {...}, "children": [...]}.
+    # Printed in parts like xml (not via json.dump of the full tree) to avoid making a copy of the bank.
+    def _print_json(self):
+        self._seps = []
+        self._file.write('[')
+        for bank in self._banks:
+            if self._parser:
+                self._print_stream(bank, self._print_json_node, self._print_json_open, self._print_json_close)
+            else:
+                self._print_json_node(bank, 0, 0)
+        self._file.write(']\n')
+        self._seps = None
 
-        if has_children:
-            if   isinstance(node, wmodel.NodeList):
-                for index, subnode in enumerate(children):
-                    self._print_txt_node(subnode, depth, index)
+    def _print_json_node(self, node, depth, index):
+        self._print_json_sep(depth)
+        self._print_json_tree(node)
+
+    # skip: node printed without children
+    def _print_json_tree(self, node, skip=None):
+        children = node.get_children()
+        head = self._get_json_head(node, node.get_attrs())
+        has_children = children and len(children) > 0
+
+        if not has_children or node is skip:
+            self._file.write(head + '}')
+            return
+
+        self._file.write(head + ',"children":[')
+        for index, subnode in enumerate(children):
+            if index > 0:
+                self._file.write(',')
+            self._print_json_tree(subnode, skip)
+        self._file.write(']}')
+
+    def _print_json_open(self, node, depth, index):
+        attrs = node.get_attrs()
+        if isinstance(node, wmodel.NodeList):
+            attrs['count'] = node.get_expected_count()
+        self._print_json_sep(depth)
+        self._file.write(self._get_json_head(node, attrs) + ',"children":[')
+        return depth + 1
+
+    def _print_json_close(self, node, depth):
+        self._file.write(']}')
+
+    # siblings need a comma between them, so mark depths that already printed something
+    def _print_json_sep(self, depth):
+        seps = self._seps
+        del seps[depth + 1:]
+        if len(seps) <= depth:
+            seps.append(False)
+        if seps[depth]:
+            self._file.write(',')
+        seps[depth] = True
+
+    def _get_json_head(self, node, attrs):
+        # bytes (fourccs) and such are printed as text, like xml
+        return '{"node":%s,"attrs":%s' % (json.dumps(node.get_nodename()), json.dumps(attrs, default=str, ensure_ascii=False))
+
+    # One JSON object per line, so tools can read banks line by line without loading everything:
+    # - each HIRC item: {"bank": filename, "item": {...item tree...}}
+    # - then the rest of the bank: {"bank": filename, "tree": {...}}, with listLoadedItem's children removed
+    def _print_ndjson(self):
+        for bank in self._banks:
+            bankname = json.dumps(bank.get_attrs()['filename'], ensure_ascii=False)
+            callback = lambda item: self._print_ndjson_item(bankname, item)
+
+            if self._parser:
+                root = bank.get_root()
+                filename = os.path.join(root.get_path(), root.get_filename())
+                stream = self._parser.stream_bank(filename, callback)
+                if stream:
+                    self._print_ndjson_tree(bankname, stream, None)
             else:
-                for subnode in children:
-                    self._print_txt_node(subnode, depth, None)
+                items = self._find_items(bank)
+                if items:
+                    for item in items.get_children() or []:
+                        callback(item)
+                self._print_ndjson_tree(bankname, bank, items)
+
+    def _print_ndjson_item(self, bankname, item):
+        self._file.write('{"bank":%s,"item":' % (bankname))
+        self._print_json_tree(item)
+        self._file.write('}\n')
+
+    def _print_ndjson_tree(self, bankname, bank, items):
+        self._file.write('{"bank":%s,"tree":' % (bankname))
+        self._print_json_tree(bank, items)
+        self._file.write('}\n')
+
+    # HIRC list is always at bank > HircChunk > listLoadedItem (no need for finders)
+    def _find_items(self, bank):
+        for chunk in bank.get_children() or []:
+            for node in chunk.get_children() or []:
+                if isinstance(node, wmodel.NodeList) and node.get_name() == 'listLoadedItem':
+                    return node
+        return None
+
+    #--------------------------------------------------------------------------
+
+    # Streamed banks are printed as items arrive: item's parents (bank > chunk > list) are opened
+    # and kept as frames of [node, depth, children depth, next child], printing pending siblings
+    # before each item. Remaining children (later chunks) are printed once parsing is done.
+    def _print_stream(self, bank, print_node, open_node, close_node):
+        root = bank.get_root()
+        filename = os.path.join(root.get_path(), root.get_filename())
+
+        self._frames = []
+        callback = lambda item: self._print_stream_item(item, print_node, open_node, close_node)
+        stream = self._parser.stream_bank(filename, callback)
+
+        if not self._frames:
+            # no items (or failed before them), print as-is
+            if stream:
+                print_node(stream, 0, 0)
+        else:
+            self._close_frames(0, print_node, close_node)
+        self._frames = None
+
+    def _print_stream_item(self, item, print_node, open_node, close_node):
+        frames = self._frames
+
+        parents = []
+        node = item.get_parent()
+        while node:
+            parents.insert(0, node)
+            node = node.get_parent()
+
+        level = 0
+        while level < len(frames) and level < len(parents) and frames[level][0] is parents[level]:
+            level += 1
+        self._close_frames(level, print_node, close_node)
+
+        for node in parents[level:]:
+            depth = 0
+            if frames:
+                parent = frames[-1]
+                depth = self._print_frame_children(parent, node, print_node)
+                parent[3] += 1
+            subdepth = open_node(node, depth, None)
+            frames.append([node, depth, subdepth, 0])
+
+        # item is removed from parent after this, so next item will be in the same position
+        frame = frames[-1]
+        self._print_frame_children(frame, item, print_node)
+        print_node(item, frame[2], item.get_index())
+
+    # prints frame's children up to target (or all), returns depth for children
+    def _print_frame_children(self, frame, target, print_node):
+        node, _, subdepth, pos = frame
+        children = node.get_children() or []
+        is_list = isinstance(node, wmodel.NodeList)
+
+        end = len(children)
+        if target is not None:
+            end = children.index(target)
+
+        for subnode in children[pos:end]:
+            index = subnode.get_index() if is_list else None
+            print_node(subnode, subdepth, index)
+        frame[3] = end
+        return subdepth
+
+    def _close_frames(self, level, print_node, close_node):
+        frames = self._frames
+        while len(frames) > level:
+            frame = frames.pop()
+            self._print_frame_children(frame, None, print_node)
+            if close_node:
+                close_node(frame[0], frame[1])
@@ -1,19 +1,33 @@
-import pkgutil
+import pkgutil, threading, posixpath
 
 class _Loader(object):
     def __init__(self):
-        pass
+        # resources don't change while running and the viewer asks for the same ones all the time
+        # (may be zipped too), so keep them in memory. Paths may come from clients, so only found
+        # files are kept, by normalized path ('a//b', 'a/./b'), to not grow with each bad request.
+        self._cache = {}
+        self._lock = threading.Lock()
 
     def get_resource_text(self, path):
-        try:
-            return pkgutil.get_data(__name__, path).decode()
-        except (FileNotFoundError, OSError): # as e
+        res = self.get_resource(path)
+        if res is None:
             return None
+        return res.decode()
 
     def get_resource(self, path):
+        key = posixpath.normpath(path)
+        with self._lock:
+            res = self._cache.get(key)
+        if res is not None:
+            return res
+
         try:
-            return pkgutil.get_data(__name__, path)
+            res = pkgutil.get_data(__name__, path)
         except (FileNotFoundError, OSError): # as e
             return None
 
+        with self._lock:
+            self._cache[key] = res
+        return res
+
 Loader = _Loader()
@@ -4,6 +4,31 @@ import re
 #   http://code.activestate.com/recipes/496702/
 #   https://git.joonis.de/snippets/4
 
+# Output of templates. Rendered parts are appended to a list that can be shared by many renders
+# (joined once at the end), rather than making a string per template.
+class TemplateOutput(list):
+
+    def write(self, *args):
+        for value in args:
+            self.write_value(value)
+
+    def write_value(self, value):
+        if type(value) is str:
+            self.append(value)
+        elif isinstance(value, TemplateCall):
+            value.call() #writes to this same output
+        else:
+            self.append(str(value))
+
+# Value that writes its output when printed by a template (like a 'body' of sub-templates),
+# so they are rendered in place instead of as a separate string.
+class TemplateCall(object):
+    __slots__ = ['call']
+
+    def __init__(self, call):
+        self.call = call
+
+
 class Template(object):
     """ Compiles a template to python code. Lines are print'd as-is while blocks are executed.
         Format:
@@ -23,6 +48,9 @@ class Template(object):
         ${
           if:
         } #also ok
+
+        Code is made into a function per set of render() arg names (passed in names, to make it
+        on load), which is then called with the output list and args (see get_function).
     """
 
     # block patterns (DOTALL: . matches LF, *? non-greedy match)
@@ -32,13 +60,20 @@ class Template(object):
     ESCAPES = [('\\{','{')]
     AUTOWRITE = re.compile(r"(^[\'\"])|(^[a-zA-Z0-9_\[\]\'\"]+$)")
     FN_WRITE = '_write'
+    FN_WRITE_VALUE = '_write_value'
+    FN_APPEND = '_append'
     FN_INCLUDE = '_include'
+    FN_RENDER = '_render'
+    INDENT_FUNCTION = 4
 
-    def __init__(self, text=None):
+    def __init__(self, text=None, names=None):
         if text is None:
             raise ValueError('text required')
         self._file = 'template.py'
-        self._code = self._compile(text)
+        self._program = self._compile(text)
+        self._functions = {}
+        if names:
+            self._get_function(tuple(names))
 
     def _compile(self, template):
         indent = 0 # indented code
@@ -59,9 +94,8 @@ class Template(object):
                 if not part:
                     continue
 
-                # regular output is created by calling: 'write("""thing""")'
-                part = part.replace('\\', '\\\\').replace('"', '\\"')
-                part = '%s%s("""%s""")' % (' ' * indent, self.FN_WRITE, part)
+                # regular output is created by calling: 'append("thing")' (as a single line literal)
+                part = '%s%s(%r)' % (' ' * indent, self.FN_APPEND, part)
 
             else: # "odd" parts = commands
                 part = part.rstrip()
@@ -70,6 +104,7 @@ class Template(object):
 
                 #commands may be ":" (block end), "(:) ...:" (python code) or "name" (autowritten var 'name')
                 command = part.strip()
+                autowrite = self.AUTOWRITE.match(command)
                 if command.startswith(':'): #block end
                     if not indent:
                         raise SyntaxError('no block statement to terminate: ${%s}$' % part)
@@ -80,8 +115,12 @@ class Template(object):
                     if not part.endswith(':'):
                         continue
 
-                elif self.AUTOWRITE.match(command):
-                    part = '%s(%s)' % (self.FN_WRITE, command) #output var
+                elif autowrite:
+                    if autowrite.group(2):
+                        # output single var, strings (most common) are added directly
+                        part = '_value = %s\n%s(_value) if type(_value) is str else %s(_value)' % (command, self.FN_APPEND, self.FN_WRITE_VALUE)
+                    else:
+                        part = '%s(%s)' % (self.FN_WRITE, command) #output var(s)
 
                 # in case of multiline command, and some cleanup
                 lines = part.splitlines()
@@ -98,34 +137,48 @@ class Template(object):
             raise SyntaxError('block statement not terminated (%i)' % indent)
 
         # finished program lines
-        program = '\n'.join(parts)
-        return compile(program, self._file, 'exec') #resulting 'code' can be called with exec(code, args)
-
-    def render(self, **code_globals):
-        text = []
-
-        # 'write' will be called to output plain text, adds text to outer list
-        def _write(*args):
-            for value in args:
-                text.append(str(value))
-
-        # 'exists' may be  called to check for var existence, since vars must exist in code_globals
-        def _exists(arg):
-            return arg in code_globals
-
-        #'include' 
-        #def _include(file):
-        #    pass
-
-
-        # contains passed render(key=value), that will become code's globals
-        code_globals['__file__'] = self._file
-        code_globals[self.FN_WRITE] = _write
-        #code_globals[self.FN_INCLUDE] = _include
-        code_globals['_exists'] = _exists
-
-        # execute template code (loads 'text')
-        exec(self._code, code_globals) #, code_locals
-
-        # create final text output
-        return ''.join(text)
+        parts.append('pass') #empty templates
+        compile('\n'.join(parts), self._file, 'exec') #early syntax check
+        return parts
+
+    # makes: def _render(_out, name1, name2...): (program), so args are locals
+    def _get_function(self, names):
+        function = self._functions.get(names)
+        if function is not None:
+            return function
+
+        indent = ' ' * self.INDENT_FUNCTION
+        lines = [
+            'def %s(_out, %s):' % (self.FN_RENDER, ', '.join(names)),
+            '%s%s = _out.append' % (indent, self.FN_APPEND),
+            '%s%s = _out.write' % (indent, self.FN_WRITE),
+            '%s%s = _out.write_value' % (indent, self.FN_WRITE_VALUE),
+        ]
+        for part in self._program:
+            for line in part.split('\n'):
+                lines.append(indent + line)
+        program = '\n'.join(lines)
+
+        # 'exists' may be called to check for var existence, since vars must be passed to render
+        code_globals = {
+            '__file__': self._file,
+            '_exists': frozenset(names).__contains__,
+        }
+        exec(compile(program, self._file, 'exec'), code_globals)
+        function = self._functions[names] = code_globals[self.FN_RENDER]
+        return function
+
+    # Returns a function(output, arg1, arg2...) that renders positional args in names order into
+    # output (a TemplateOutput), for callers that render many times (faster than render_to).
+    def get_function(self, names):
+        return self._get_function(tuple(names))
+
+    # renders into output (a TemplateOutput shared by multiple renders)
+    def render_to(self, output, **args):
+        function = self._get_function(tuple(args.keys()))
+        function(output, *args.values())
+
+    def render(self, **args):
+        output = TemplateOutput()
+        self.render_to(output, **args)
+        return ''.join(output)
@@ -1,11 +1,15 @@
-import logging, random, threading
-import webbrowser, http, http.server, socketserver
+import logging, random, threading, json, gzip, zlib, io, socket, asyncio
+import webbrowser, http, http.server, socketserver, bisect
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
 from urllib import parse
 
 from . import wtemplate, wloader, wmarkdown
+from ..parser import wmodel
 
 
 DEFAULT_PORT = 55123
+DEFAULT_ASYNC_JOBS = 4
 #URL_BASE = 'http://localhost:%i/'
 URL_MAIN = 'wwiser'
 
@@ -21,6 +25,11 @@ class Viewer(object):
         self.port = None
         self._httpd = None
         self._thread = None
+        self._async_jobs = 0
+
+    # serves with asyncio + a limited number of workers, rather than a new thread per request
+    def set_async_jobs(self, jobs):
+        self._async_jobs = jobs
 
     def _serve(self):
         try:
@@ -53,11 +62,13 @@ class Viewer(object):
         #http.socketserver.TCPServer
         #http.server.HTTPServer
         #ThreadedHTTPServer
-        server = ThreadedHTTPServer
-
+        #AsyncHTTPServer
         address = ('localhost', port)
 
-        self._httpd = server(address, handler)
+        if self._async_jobs:
+            self._httpd = AsyncHTTPServer(address, handler, self._async_jobs)
+        else:
+            self._httpd = ThreadedHTTPServer(address, handler)
         if blocking:
             try:
                 self._serve()
@@ -89,16 +100,272 @@ class Viewer(object):
 
 #******************************************************************************
 
+# Rendered response body, with its ETag and gzipped version (made on first use)
+class Fragment(object):
+    __slots__ = ['body', 'etag', '_gzip']
+    GZIP_LEVEL = 5
+
+    def __init__(self, body):
+        self.body = body
+        self.etag = '"%08x-%x"' % (zlib.crc32(body), len(body))
+        self._gzip = None
+
+    def get_gzip(self):
+        if self._gzip is None:
+            self._gzip = gzip.compress(self.body, self.GZIP_LEVEL)
+        return self._gzip
+
+    # gzip is made later and is smaller than the body, so size is only counted from the body (must not change)
+    def get_size(self):
+        return len(self.body)
+
+# LRU of rendered fragments, as re-rendering the same nodes on every request is slow with big banks.
+# Keys are the request's node handle + stopper config. Banks may be (un)loaded while the viewer
+# is open (GUI) and names may be loaded later, so everything is dropped when either changes.
+# Limited by total size rather than entries, as a full render of all banks may be huge.
+class FragmentCache(object):
+    CACHE_BYTES = 0x4000000 #64MB
+
+    def __init__(self):
+        self._items = OrderedDict()
+        self._size = 0
+        self._banks_key = None
+        self._lock = threading.Lock()
+
+    def set_banks_key(self, banks_key):
+        with self._lock:
+            if self._banks_key == banks_key:
+                return
+            self._banks_key = banks_key
+            self._items.clear()
+            self._size = 0
+
+    def get(self, key):
+        with self._lock:
+            fragment = self._items.get(key)
+            if fragment is not None:
+                self._items.move_to_end(key)
+            return fragment
+
+    # banks_key is the one used to render, as banks may change meanwhile (then fragment is old)
+    def add(self, key, fragment, banks_key):
+        size = fragment.get_size()
+        if size > self.CACHE_BYTES:
+            return
+        with self._lock:
+            if self._banks_key != banks_key:
+                return
+            if key in self._items:
+                self._size -= self._items.pop(key).get_size()
+            self._items[key] = fragment
+            self._size += size
+            while self._size > self.CACHE_BYTES:
+                _, old = self._items.popitem(last=False)
+                self._size -= old.get_size()
+
+#******************************************************************************
+
 class ThreadedHTTPServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
     pass
 
+# Server with an asyncio loop that only handles sockets, while requests are processed by the usual
+# handler in a bounded pool (rendering is CPU-bound so more threads don't help, and unbounded threads
+# with big banks may use lots of memory). Threads rather than processes since handlers need the
+# loaded banks. Same interface as ThreadedHTTPServer (serve_forever/shutdown).
+class AsyncHTTPServer(object):
+    PENDING_PER_JOB = 4 #requests waiting for a worker, more wait in the loop
+    HEAD_TIMEOUT = 10 #secs to get a request from a connection (browsers may open idle ones)
+
+    def __init__(self, address, handler, jobs):
+        # bind now so browser can connect once viewer opens it
+        self._socket = socket.create_server(address)
+        self.server_address = self._socket.getsockname()
+        self._jobs = jobs
+        self._executor = ThreadPoolExecutor(max_workers=jobs)
+        self._loop = None
+        self._server = None
+        self._stop = threading.Event()
+        self._pending = None
+        self._clients = set()
+
+        class AsyncHandler(_AsyncHandlerMixin, handler):
+            pass
+        self._handler = AsyncHandler
+
+    def serve_forever(self):
+        try:
+            asyncio.run(self._serve())
+        finally:
+            self._executor.shutdown(wait=False)
+            self._socket.close()
+
+    async def _serve(self):
+        self._loop = asyncio.get_running_loop()
+        if self._stop.is_set(): #shutdown before the loop was set (socket is closed by serve_forever)
+            return
+        self._pending = asyncio.Semaphore(self._jobs * self.PENDING_PER_JOB)
+        self._server = await asyncio.start_server(self._handle_client, sock=self._socket)
+        if self._stop.is_set(): #shutdown while starting
+            self._server.close()
+            return
+        try:
+            await self._server.serve_forever()
+        except asyncio.CancelledError:
+            pass #closed
+
+        # stop connections still open (idle or waiting for a worker) and wait for running requests
+        clients = list(self._clients)
+        for task in clients:
+            task.cancel()
+        await asyncio.gather(*clients, return_exceptions=True)
+
+    # called from other threads
+    # (flag is set first, so _serve either sees it or has set the loop to get the close call)
+    def shutdown(self):
+        self._stop.set()
+        loop = self._loop
+        if not loop:
+            # not serving yet, and won't (also for servers never started)
+            self._socket.close()
+            return
+        try:
+            loop.call_soon_threadsafe(self._close)
+        except RuntimeError:
+            pass #loop already done
+
+    def _close(self):
+        if self._server:
+            self._server.close()
+
+    async def _handle_client(self, reader, writer):
+        task = asyncio.current_task()
+        self._clients.add(task)
+        try:
+            # only GETs (no body), so just the request line + headers are needed
+            # (read before waiting for a worker, so idle connections don't take others' place)
+            try:
+                head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), self.HEAD_TIMEOUT)
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ConnectionError):
+                return
+
+            wfile = _AsyncWriter(self._loop, writer)
+            address = writer.get_extra_info('peername')
+            async with self._pending:
+                job = self._loop.run_in_executor(self._executor, self._process, head, wfile, address)
+                try:
+                    await asyncio.shield(job)
+                except asyncio.CancelledError:
+                    # shutdown: workers can't be stopped, but their writes fail once the connection is dropped
+                    wfile.close()
+                    writer.transport.abort()
+                    await job
+        except asyncio.CancelledError:
+            pass #shutdown
+        finally:
+            self._clients.discard(task)
+            writer.close()
+
+    def _process(self, head, wfile, address):
+        try:
+            self._handler((head, wfile), address, self)
+        except Exception as e:
+            # usually client closing the connection
+            logging.debug("viewer: request error: %s" % (e))
+
+# handler's output, written from workers to the loop's stream in chunks (waiting until sent,
+# so big responses don't pile up in memory)
+class _AsyncWriter(object):
+    CHUNK_SIZE = 0x10000
+
+    def __init__(self, loop, writer):
+        self._loop = loop
+        self._writer = writer
+        self.closed = False
+
+    async def _write(self, data):
+        self._writer.write(data)
+        await self._writer.drain()
+
+    def write(self, data):
+        if self.closed:
+            raise ConnectionAbortedError("viewer stopped")
+        data = memoryview(data)
+        for pos in range(0, len(data), self.CHUNK_SIZE):
+            chunk = data[pos:pos + self.CHUNK_SIZE]
+            asyncio.run_coroutine_threadsafe(self._write(chunk), self._loop).result()
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+# reads/writes handler's request from AsyncHTTPServer instead of a socket
+class _AsyncHandlerMixin(object):
+
+    def setup(self):
+        head, wfile = self.request
+        self.connection = None
+        self.rfile = io.BytesIO(head)
+        self.wfile = wfile
+
+    def finish(self):
+        pass
+
+# Nodes are addressed by their position in the bank tree ("bank index-child index-child index..."),
+# so stopped nodes can be found again on later requests without keeping refs or id() maps around
+# (which would grow forever). Handles are also stable between runs with the same banks.
+class NodeHandles(object):
+
+    def __init__(self, parser):
+        self._parser = parser
+
+    def get_handle(self, handle, index):
+        if handle is None:
+            return str(index) #bank
+        return '%s-%i' % (handle, index)
+
+    def get_banks(self):
+        return self._parser.get_banks()
+
+    # identifies current banks and names, to detect changes (names may be loaded after banks)
+    def get_banks_key(self):
+        names = self._parser.get_names()
+        names_key = None
+        if names:
+            names_key = (id(names), names.get_generation())
+        banks_key = tuple((bank.get_root().get_filename(), id(bank)) for bank in self._parser.get_banks())
+        return (banks_key, names_key)
+
+    def find_node(self, handle):
+        try:
+            indexes = [int(index) for index in handle.split('-')]
+        except ValueError:
+            return None
+
+        banks = self._parser.get_banks()
+        index = indexes[0]
+        if index < 0 or index >= len(banks):
+            return None
+        node = banks[index]
+
+        for index in indexes[1:]:
+            children = node.get_children()
+            if not children or index < 0 or index >= len(children):
+                return None
+            node = children[index]
+        return node
+
 class NodePrinter(object):
     TEMPLATE_DEFAULT = 'unknown'
     TEMPLATE_NODENAMES_WITH_MAINNAMES = ['object'] #to ignore field names
+    TEMPLATE_ARGS = ['id', 'attrs', 'body', 'extra'] #passed to node templates (compiled on load)
 
-    def __init__(self):
-        self.stopped_nodes = {}
+    def __init__(self, handles):
+        self.handles = handles
         self.templates = {}
+        self.renders = {}
 
     def _get_template_base(self, name):
         if not name:
@@ -109,10 +376,19 @@ class NodePrinter(object):
             if not res:
                 tpl = None
             else:
-                tpl = wtemplate.Template(res.decode())
+                tpl = wtemplate.Template(res.decode(), names=self.TEMPLATE_ARGS)
             self.templates[name] = tpl #name is registered, but no template associated
         return self.templates[name]
 
+    # template's render function for a node, (mainname, nodename) combos are repeated a lot
+    def _get_render(self, mainname, nodename):
+        key = (mainname, nodename)
+        render = self.renders.get(key)
+        if render is None:
+            tpl = self._get_template(mainname, nodename)
+            render = self.renders[key] = tpl.get_function(self.TEMPLATE_ARGS)
+        return render
+
     # get a suitable template: CAkSound (mainname) > object (nodename > unknown (default)
     def _get_template(self, mainname, nodename):
 
@@ -131,17 +407,17 @@ class NodePrinter(object):
 
         raise ValueError('no template found')
 
-    def _is_stop(self, nodename, attrs):
+    def _is_stop(self, stopper, nodename, attrs):
         #meh, improve
 
-        if not self.stopper:
+        if not stopper:
             return False
 
-        stop_nodename = self.stopper['nodename']
+        stop_nodename = stopper['nodename']
         if not stop_nodename == nodename:
             return False
 
-        stop_attrs = self.stopper['attrs']
+        stop_attrs = stopper['attrs']
         if stop_attrs:
             for key in stop_attrs.keys():
                 if not key in attrs or stop_attrs[key] != attrs[key]:
@@ -149,9 +425,9 @@ class NodePrinter(object):
 
         return True
 
-    #meh, use list join
-    def _print_node(self, node, stop=False):
-        nodeid = id(node)
+    # stopper is passed around rather than kept in the printer, as it's shared by server threads.
+    # All templates render to the same output, children being written when the template prints 'body'.
+    def _print_node(self, output, node, handle, stopper, stop=False):
         nodename = node.get_nodename()
         name = node.get_name()
         attrs = node.get_attrs()
@@ -161,42 +437,268 @@ class NodePrinter(object):
 
         if stop:
             extra = 'hidden js-load-node %s' % (attrs['name'])
-            self.stopped_nodes[nodeid] = node
 
-        stop_children = self._is_stop(nodename, attrs)
         if children and not stop:
-            msgs = []
-            for subnode in children:
-                msg = self._print_node(subnode, stop=stop_children)
-                msgs.append(msg)
-            body = body.join(msgs)
-
-        tpl = self._get_template(name, nodename)
-        msg = tpl.render(id=nodeid, attrs=attrs, body=body, extra=extra)
-        return msg
-
-    def write_bank(self, node, all):
+            stop_children = self._is_stop(stopper, nodename, attrs)
+            def print_children():
+                for index, subnode in enumerate(children):
+                    subhandle = self.handles.get_handle(handle, index)
+                    self._print_node(output, subnode, subhandle, stopper, stop=stop_children)
+            body = wtemplate.TemplateCall(print_children)
+
+        render = self._get_render(name, nodename)
+        render(output, handle, attrs, body, extra) #same order as TEMPLATE_ARGS
+
+    def _print(self, node, handle, stopper):
+        output = wtemplate.TemplateOutput()
+        self._print_node(output, node, handle, stopper)
+        return ''.join(output)
+
+    def write_bank(self, index, node, all):
         # writes node + immediate children until conditions
         # we want to show the HIRC list, but not the objects so the browser can probably handle
         # the amount of DOM nodes (maybe should add a limit of results + "load more" too)
         if all:
-            self.stopper = None
+            stopper = None
         else:
             name = 'listLoadedItem'
-            self.stopper = {
+            stopper = {
                 'nodename': 'list',
                 'attrs': {'name': name},
             }
-        msg = self._print_node(node)
+        handle = self.handles.get_handle(None, index)
+        msg = self._print(node, handle, stopper)
         return msg
 
-    def write_node(self, nodeid):
-        self.stopper = None
-        # find by id and never stop
-        node = self.stopped_nodes[nodeid]
-        msg = self._print_node(node)
+    def write_node(self, handle):
+        # find by handle and never stop
+        node = self.handles.find_node(handle)
+        msg = self._print(node, handle, None)
         return msg
 
+# Prints nodes as JSON for viewer.js to render. Like NodePrinter, HIRC items aren't included in banks
+# (only a first page of item heads), and are loaded later by id.
+# Each node is {"node": nodename, "attrs": {...}, "children": [...]}, plus for nodes that can be
+# loaded later: "id" and "lazy" (object whose children aren't included) or "more" (list with pending items)
+class NodeJsonPrinter(object):
+    PAGE_SIZE = 100
+    PAGE_MAX = 1000
+
+    def __init__(self, handles):
+        self.handles = handles
+
+    def _get_obj(self, node):
+        return {
+            'node': node.get_nodename(),
+            'attrs': node.get_attrs(),
+        }
+
+    # object without children (not read yet for lazy banks)
+    def _get_head(self, node, handle):
+        obj = self._get_obj(node)
+        obj['id'] = handle
+        obj['lazy'] = True
+        return obj
+
+    def _get_page(self, node, handle, start, count):
+        children = node.get_children() or []
+        heads = []
+        for index in range(start, min(start + count, len(children))):
+            heads.append(self._get_head(children[index], self.handles.get_handle(handle, index)))
+        return heads
+
+    def _is_stop(self, node):
+        return isinstance(node, wmodel.NodeList) and node.get_name() == 'listLoadedItem'
+
+    # stack-based rather than recursive, as trees can be deep
+    def _get_tree(self, node, handle, stop):
+        tree = self._get_obj(node)
+        tree['id'] = handle
+
+        nodes = [(node, handle, tree)]
+        while nodes:
+            node, handle, obj = nodes.pop()
+            children = node.get_children()
+            if not children:
+                continue
+
+            if stop and self._is_stop(node):
+                obj['id'] = handle
+                obj['children'] = self._get_page(node, handle, 0, self.PAGE_SIZE)
+                obj['more'] = len(children) > self.PAGE_SIZE
+                continue
+
+            subobjs = obj['children'] = []
+            for index, subnode in enumerate(children):
+                subobj = self._get_obj(subnode)
+                subobjs.append(subobj)
+                nodes.append((subnode, self.handles.get_handle(handle, index), subobj))
+        return tree
+
+    def _dumps(self, obj):
+        # bytes (fourccs) and such are printed as text, like the dumper
+        return json.dumps(obj, default=str, ensure_ascii=False, separators=(',',':'))
+
+    def write_banks(self, banks, all):
+        items = []
+        for index, bank in enumerate(banks):
+            items.append(self._get_tree(bank, self.handles.get_handle(None, index), not all))
+        return self._dumps(items)
+
+    def write_list(self, handle, start, count):
+        node = self.handles.find_node(handle)
+        count = min(count, self.PAGE_MAX)
+        children = node.get_children() or []
+        obj = {
+            'id': handle,
+            'start': start,
+            'children': self._get_page(node, handle, start, count),
+            'more': len(children) > start + count,
+        }
+        return self._dumps(obj)
+
+    def write_node(self, handle):
+        node = self.handles.find_node(handle)
+        return self._dumps(self._get_tree(node, handle, False))
+
+# Text index of current banks for searches: sid/tid values, hashnames/guidnames and HIRC class names,
+# each pointing to handles of the matched node and its HIRC item (or chunk outside HIRC).
+# Built once on first search, and again if loaded banks change. Lazy items that aren't loaded
+# yet only index their header (ID), as loading them all defeats the point of lazy banks.
+class NodeSearchIndex(object):
+    SEARCH_MAX = 500
+
+    def __init__(self, handles):
+        self.handles = handles
+        self._banks_key = None
+        self._index = ({}, {}, [], [], '')
+        self._lock = threading.Lock()
+
+    # returns current (ids, names, keys, keys offsets, keys text), rebuilt if needed
+    def _update(self):
+        banks_key = self.handles.get_banks_key()
+        with self._lock:
+            if self._banks_key == banks_key:
+                return self._index
+
+        # may be slow (names are looked up) so other searches aren't blocked meanwhile
+        index = self._build()
+        with self._lock:
+            self._index = index
+            self._banks_key = banks_key
+        return index
+
+    def _add(self, index, key, handle, item):
+        postings = index.get(key)
+        if postings is None:
+            postings = index[key] = []
+        postings.append((handle, item))
+
+    def _build(self):
+        logging.info("viewer: building search index")
+        ids = {}
+        names = {}
+
+        for bindex, bank in enumerate(self.handles.get_banks()):
+            bhandle = self.handles.get_handle(None, bindex)
+            filename = bank.get_root().get_filename()
+
+            # (node, handle, item, is HIRC item), item being (item's handle, bank name, item name)
+            # saved as-is, so results don't depend on banks loaded later
+            nodes = [(bank, bhandle, (bhandle, filename, bank.get_name()), False)]
+            while nodes:
+                node, handle, item, is_item = nodes.pop()
+
+                if is_item:
+                    self._add(names, node.get_name().lower(), handle, item)
+
+                if isinstance(node, wmodel.NodeField):
+                    if node.get_type_id() in (wmodel.SYMBOL_SID, wmodel.SYMBOL_TID):
+                        attrs = node.get_attrs()
+                        self._add(ids, attrs['value'], handle, item)
+                        for key in ['hashname', 'guidname']:
+                            if key in attrs:
+                                self._add(names, attrs[key].lower(), handle, item)
+
+                if node.is_lazy():
+                    children = node.get_loaded_children()
+                else:
+                    children = node.get_children()
+                if not children:
+                    continue
+
+                is_items = isinstance(node, wmodel.NodeList) and node.get_name() == 'listLoadedItem'
+                for index in range(len(children) - 1, -1, -1): #reversed to pop in order
+                    subnode = children[index]
+                    subhandle = self.handles.get_handle(handle, index)
+                    if is_items or node is bank:
+                        nodes.append((subnode, subhandle, (subhandle, filename, subnode.get_name()), is_items))
+                    else:
+                        nodes.append((subnode, subhandle, item, False))
+
+        # partial matches search all names joined at once, then find which name matched by offset
+        keys = sorted(names)
+        offsets = []
+        offset = 0
+        for key in keys:
+            offsets.append(offset)
+            offset += len(key) + 1
+        text = '\n'.join(keys)
+
+        logging.info("viewer: search index done (%i ids, %i names)" % (len(ids), len(names)))
+        return ids, names, keys, offsets, text
+
+    # finds postings for exact ids and names, then names containing the query
+    def _find(self, query, index):
+        ids, names, keys, offsets, text = index
+        query = query.strip()
+        if not query:
+            return
+
+        if query.isdigit():
+            yield query, ids.get(int(query), [])
+
+        query = query.lower()
+        yield query, names.get(query, [])
+
+        pos = text.find(query)
+        while pos >= 0:
+            i = bisect.bisect_right(offsets, pos) - 1
+            name = keys[i]
+            end = offsets[i] + len(name)
+            if pos + len(query) <= end and name != query: #not across names
+                yield name, names[name]
+            pos = text.find(query, end + 1)
+
+    def search(self, query, max=None):
+        index = self._update()
+        if not max or max > self.SEARCH_MAX:
+            max = self.SEARCH_MAX
+
+        results = []
+        more = False
+        for match, postings in self._find(query, index):
+            for handle, (item, filename, name) in postings:
+                if len(results) >= max:
+                    more = True
+                    break
+                results.append({
+                    'id': item,
+                    'node': handle,
+                    'bank': filename,
+                    'name': name,
+                    'match': match,
+                })
+            if more:
+                break
+
+        obj = {
+            'query': query,
+            'results': results,
+            'more': more,
+        }
+        return obj
+
 #******************************************************************************
 
 class ViewerHandler(http.server.BaseHTTPRequestHandler):
@@ -217,6 +719,10 @@ class ViewerHandler(http.server.BaseHTTPRequestHandler):
             '/load-banks': self.do_load_banks,
             '/load-node': self.do_load_node,
             '/load-docs': self.do_load_docs,
+            '/api/banks': self.do_api_banks,
+            '/api/list': self.do_api_list,
+            '/api/node': self.do_api_node,
+            '/search': self.do_search,
         }
         filetypes = {
             '.html': 'text/html; charset=utf-8',
@@ -255,11 +761,17 @@ class ViewerHandler(http.server.BaseHTTPRequestHandler):
     #**************************************************************************
     # WRITERS
 
+    GZIP_MIN = 0x400 #small responses aren't worth it
+
+    TYPE_HTML = 'text/html; charset=utf-8'
+    TYPE_TEXT = 'text/plain; charset=utf-8'
+    TYPE_JSON = 'application/json; charset=utf-8'
+
     def _start_html(self):
-        self._start('text/html; charset=utf-8')
+        self._start(self.TYPE_HTML)
 
     def _start_text(self):
-        self._start('text/plain; charset=utf-8')
+        self._start(self.TYPE_TEXT)
 
     def _start(self, type):
         self.send_response(200)
@@ -269,6 +781,41 @@ class ViewerHandler(http.server.BaseHTTPRequestHandler):
     def _output(self, message):
         self.wfile.write(message)
 
+    # renders (on cache miss) and sends a response, with ETag and gzip support
+    def _output_cached(self, key, type, render):
+        banks_key = self._handles.get_banks_key()
+        self._cache.set_banks_key(banks_key)
+        fragment = self._cache.get(key)
+        if fragment is None:
+            fragment = Fragment(render())
+            self._cache.add(key, fragment, banks_key)
+        self._output_fragment(type, fragment)
+
+    def _output_fragment(self, type, fragment):
+        etags = self.headers.get('If-None-Match')
+        if etags and fragment.etag in [etag.strip() for etag in etags.split(',')]:
+            self.send_response(304)
+            self.send_header('ETag', fragment.etag)
+            self.end_headers()
+            return
+
+        body = fragment.body
+        encoding = None
+        if len(body) >= self.GZIP_MIN and 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = fragment.get_gzip()
+            encoding = 'gzip'
+
+        self.send_response(200)
+        self.send_header('Content-Type', type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', fragment.etag)
+        self.send_header('Cache-Control', 'no-cache') #always revalidate (banks may change between runs)
+        self.send_header('Vary', 'Accept-Encoding')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.end_headers()
+        self.wfile.write(body)
+
     #**************************************************************************
     # GENERAL ACTIONS
 
@@ -276,19 +823,38 @@ class ViewerHandler(http.server.BaseHTTPRequestHandler):
         # disallow only up to root?
         if '../' in path:
             raise ValueError("Path error")
-        try:
-            msg = wloader.Loader.get_resource('resources' + path)
-            self._start(type)
-            self._output(msg)
-        except:
-            #self.do_error()
-            pass
+        msg = wloader.Loader.get_resource('resources' + path)
+        if msg is None:
+            self.do_error()
+            return
+        self._output_cached(('file', path), type, lambda: msg)
 
     def do_error(self):
         self.send_response(404)
         self.end_headers()
         self.wfile.write(b'404/Not Found')
 
+    def do_bad_request(self):
+        self.send_response(400)
+        self.end_headers()
+        self.wfile.write(b'400/Bad Request')
+
+    # query params (blank values are ignored by parse_qs), None if missing
+    def _get_param(self, params, key):
+        values = params.get(key)
+        if not values:
+            return None
+        return values[0]
+
+    # positive number params, None if invalid (default if missing)
+    def _get_param_int(self, params, key, default):
+        value = self._get_param(params, key)
+        if value is None:
+            return default
+        if not value.isdigit():
+            return None
+        return int(value)
+
     def do_test(self):
         ppath = self.ppath
         lines  = []
@@ -325,30 +891,81 @@ class ViewerHandler(http.server.BaseHTTPRequestHandler):
 
     def do_main(self):
         msg = wloader.Loader.get_resource('resources/viewer.html')
-        self._start_html()
-        self._output(msg)
+        self._output_cached(('file', '/viewer.html'), self.TYPE_HTML, lambda: msg)
 
     def do_load_banks(self):
         params = parse.parse_qs(self.ppath.query)
         load_all = 'all' in params
         is_simple = 'simple' in params
 
-        self._start_html()
         if is_simple:
+            self._start_html()
             msg = ":("
             self._output(bytes(msg, 'utf-8'))
         else:
-            for node in self._parser.get_banks():
-                msg = self._printer.write_bank(node, load_all)
-                self._output(bytes(msg, 'utf-8'))
+            def render():
+                msgs = [self._printer.write_bank(index, node, load_all) for index, node in enumerate(self._parser.get_banks())]
+                return bytes(''.join(msgs), 'utf-8')
+            self._output_cached(('load-banks', load_all), self.TYPE_HTML, render)
 
     def do_load_node(self):
         params = parse.parse_qs(self.ppath.query)
-        nodeid = int(params.get('id')[0])
+        handle = self._get_param(params, 'id')
+        if handle is None:
+            self.do_bad_request()
+            return
+        if not self._handles.find_node(handle):
+            self.do_error()
+            return
 
-        self._start_html()
-        msg = self._printer.write_node(nodeid)
-        self._output(bytes(msg, 'utf-8'))
+        render = lambda: bytes(self._printer.write_node(handle), 'utf-8')
+        self._output_cached(('load-node', handle), self.TYPE_HTML, render)
+
+    def do_api_banks(self):
+        params = parse.parse_qs(self.ppath.query)
+        load_all = 'all' in params
+
+        render = lambda: bytes(self._json_printer.write_banks(self._parser.get_banks(), load_all), 'utf-8')
+        self._output_cached(('api-banks', load_all), self.TYPE_JSON, render)
+
+    def do_api_list(self):
+        params = parse.parse_qs(self.ppath.query)
+        handle = self._get_param(params, 'id')
+        start = self._get_param_int(params, 'start', 0)
+        count = self._get_param_int(params, 'count', NodeJsonPrinter.PAGE_SIZE)
+        if handle is None or start is None or not count: #empty pages would make clients ask forever
+            self.do_bad_request()
+            return
+        if not self._handles.find_node(handle):
+            self.do_error()
+            return
+
+        render = lambda: bytes(self._json_printer.write_list(handle, start, count), 'utf-8')
+        self._output_cached(('api-list', handle, start, count), self.TYPE_JSON, render)
+
+    def do_api_node(self):
+        params = parse.parse_qs(self.ppath.query)
+        handle = self._get_param(params, 'id')
+        if handle is None:
+            self.do_bad_request()
+            return
+        if not self._handles.find_node(handle):
+            self.do_error()
+            return
+
+        render = lambda: bytes(self._json_printer.write_node(handle), 'utf-8')
+        self._output_cached(('api-node', handle), self.TYPE_JSON, render)
+
+    def do_search(self):
+        params = parse.parse_qs(self.ppath.query)
+        query = self._get_param(params, 'q') or ''
+        max = self._get_param_int(params, 'max', 0)
+        if max is None:
+            self.do_bad_request()
+            return
+
+        render = lambda: bytes(json.dumps(self._search.search(query, max), ensure_ascii=False), 'utf-8')
+        self._output_cached(('search', query, max), self.TYPE_JSON, render)
 
     def do_load_docs(self):
         docnames = {
@@ -357,8 +974,13 @@ class ViewerHandler(http.server.BaseHTTPRequestHandler):
         }
 
         params = parse.parse_qs(self.ppath.query)
-        docname = docnames[params.get('doc')[0]]
+        docname = docnames.get(self._get_param(params, 'doc'))
+        if not docname:
+            self.do_bad_request()
+            return
+        self._output_cached(('load-docs', docname), self.TYPE_HTML, lambda: self._render_doc(docname))
 
+    def _render_doc(self, docname):
         doc = wloader.Loader.get_resource('../../doc/'+docname) #src
         if not doc:
             doc = wloader.Loader.get_resource('../../'+docname) #base
@@ -370,17 +992,23 @@ class ViewerHandler(http.server.BaseHTTPRequestHandler):
         text = doc.decode()
         md = wmarkdown.Markdown()
         msg = md.convert(text)
-
-        self._start_html()
-        self._output(bytes(msg, 'utf-8'))
+        return bytes(msg, 'utf-8')
 
 def HandlerFactory(parser):
     #global, as init/handler is called on every request but it saves some stuff
-    node_printer = NodePrinter()
+    handles = NodeHandles(parser)
+    node_printer = NodePrinter(handles)
+    json_printer = NodeJsonPrinter(handles)
+    cache = FragmentCache()
+    search = NodeSearchIndex(handles)
 
     class CustomHandler(ViewerHandler):
         def __init__(self, *args, **kwargs):
              self._parser = parser
+             self._handles = handles
              self._printer = node_printer
+             self._json_printer = json_printer
+             self._cache = cache
+             self._search = search
              super(CustomHandler, self).__init__(*args, **kwargs)
     return CustomHandler
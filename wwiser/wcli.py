@@ -44,14 +44,17 @@ class Cli(object):
         p.add_argument('-m',  '--multi',                help="Treat files as multiple separate files", action='store_true')
         p.add_argument('-r',  '--recursive',            help="Load banks recursively (use with wildcards like **/*.bnk)", action='store_true')
         p.add_argument('-c',  '--config',               help="Set config text file\nAllows same CLI options but in a text file\n(may split commands into multiple lines)\n(write '#@new' to start a new process in the same file)")
-        p.add_argument('-d',  '--dump-type',            help="Set dump type: txt|xml|xsl|xsl_s|none (default: auto)", metavar='TYPE')
+        p.add_argument('-d',  '--dump-type',            help="Set dump type: txt|xml|xsl|xsl_s|json|ndjson|none (default: auto)", metavar='TYPE')
         p.add_argument('-dn', '--dump-name',            help="Set dump filename (default: auto)", metavar='NAME')
+        p.add_argument('-ds', '--dump-stream',          help="Dump HIRC items as they are read, then discard them\n(uses less memory with huge banks, dumps only)", action='store_true')
         p.add_argument('-l',  '--log',                  help="Write info to wwiser log (has extra messages)", action='store_true')
         p.add_argument('-v',  '--viewer',               help="Start the viewer", action='store_true')
         p.add_argument('-vp', '--viewer-port',          help="Set the viewer port", metavar='PORT', default=wview.DEFAULT_PORT)
+        p.add_argument('-va', '--viewer-async',         help="Serve the viewer with asyncio and N render workers\n(default: thread per request, or %i if set without N)" % (wview.DEFAULT_ASYNC_JOBS), metavar='N', type=int, nargs='?', const=wview.DEFAULT_ASYNC_JOBS)
         #p.add_argument('-iv', '--ignore-version',      help="Ignore bank version check", action='store_true')
         p.add_argument('-sl', '--save-lst',             help="Clean wwnames.txt and include missing hashnames\n(needs dump set)", action='store_true')
         p.add_argument('-br', '--bank-repeat',          help="Override repeated banks handling:\n  manual / first / last / smallest / biggest / biggest+last")
+        p.add_argument('-bl', '--bank-lazy',            help="Read HIRC items on first use\n(faster and uses less memory when only some items are needed,\nsuch as filtering TXTP)", action='store_true')
 
         p = parser.add_argument_group('txtp options')
         p.add_argument('-g',  '--txtp',                 help="Generate TXTP", action='store_true')
@@ -99,6 +102,7 @@ class Cli(object):
         p = parser.add_argument_group('extra options (for testing)')
         p.add_argument('-nl', '--names-lst',            help="Set wwnames.txt companion file (default: auto)", metavar='NAME')
         p.add_argument('-nd', '--names-db',             help="Set wwnames.db3 companion file (default: auto)", metavar='NAME')
+        p.add_argument('-ndp','--names-db-preload',     help="Read wwnames.db3 names for all bank IDs at once\n(faster with big dumps)", action='store_true')
         p.add_argument('-sd', '--save-db',              help="Save/update wwnames.db3 with hashnames used in fields\n(needs dump set, or save-all)", action='store_true')
         p.add_argument('-gm', '--txtp-move',            help="Move all .wem referenced in loaded banks to wem dir", action='store_true')
 
@@ -266,15 +270,36 @@ class Cli(object):
 
     def _execute(self, args, filenames):
 
+        # default dump type
+        if args.dump_type is None:
+            if args.save_lst:
+                 #forces all names without making a file
+                args.dump_type = wdumper.TYPE_EMPTY
+            elif args.txtp or args.viewer:
+                # not very useful for txtp/viewer
+                args.dump_type = wdumper.TYPE_NONE
+            else:
+                # default without other flags
+                args.dump_type = wdumper.TYPE_XSL_SMALLER
+
+        # items are only needed while dumping
+        stream = args.dump_stream
+        if stream and (args.txtp or args.viewer or args.file_cleaner or args.dump_type in (wdumper.TYPE_EMPTY, wdumper.TYPE_NONE)):
+            logging.info("dump stream only works with txt/xml/json dumps, ignored")
+            stream = False
+
         # process banks
         parser = wparser.Parser()
         #parser.set_ignore_version(args.ignore_version)
+        parser.set_lazy(args.bank_lazy)
+        parser.set_skip_items(stream)
         parser.parse_banks(filenames)
         banks = parser.get_banks(args.bank_repeat)
 
 
         # load names
         names = wnames.Names()
+        names.set_preload_db(args.names_db_preload)
         names.parse_files(banks, parser.get_filenames(), lst=args.names_lst, db=args.names_db)
         parser.set_names(names)
 
@@ -286,23 +311,16 @@ class Cli(object):
             else:
                 dump_name = 'banks'
 
-        # default dump type
-        if args.dump_type is None:
-            if args.save_lst:
-                 #forces all names without making a file
-                args.dump_type = wdumper.TYPE_EMPTY
-            elif args.txtp or args.viewer:
-                # not very useful for txtp/viewer
-                args.dump_type = wdumper.TYPE_NONE
-            else:
-                # default without other flags
-                args.dump_type = wdumper.TYPE_XSL_SMALLER
         dumper = wdumper.DumpPrinter(banks, args.dump_type, dump_name)
+        if stream:
+            dumper.set_stream(parser)
         dumper.dump()
 
         # start viewer
         if args.viewer:
             viewer = wview.Viewer(parser)
+            if args.viewer_async:
+                viewer.set_async_jobs(args.viewer_async)
 
             logging.info("(stop viewer with CTRL+C)")
             viewer.start(port=args.viewer_port)
@@ -348,7 +366,7 @@ class Cli(object):
         names.close() #in case DB was open
 
         if args.tests:
-            wtests.Tests().main()
+            wtests.Tests().main(parser.get_filenames())
 
     def _generate(self, args, banks, locator, names, tags):
             # generate txtp
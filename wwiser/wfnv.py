@@ -2,6 +2,7 @@ import re
 
 class Fnv(object):
     FNV_DICT = '0123456789abcdefghijklmnopqrstuvwxyz_'
+    FNV_DICT_BYTES = frozenset(ord(c) for c in FNV_DICT)
     FNV_FORMAT = re.compile(r"^[a-z_][a-z0-9\_]*$")
     FNV_FORMAT_EX = re.compile(r"^[a-z_0-9][a-z0-9_()\- ,]*$")
 
@@ -14,27 +15,29 @@ class Fnv(object):
 
     # Find actual name from a close name (same up to last char) using some fuzzy searching
     # ('bgm0' and 'bgm9' IDs only differ in the last byte, so it calcs 'bgm' + '0', '1'...)
+    # Last FNV step is (hash * prime) ^ byte, so the byte can be found directly by xor'ing
+    # the id with the base name's hash * prime.
     def unfuzzy_hashname_lw(self, id, lowname, hashname):
         if not id or not hashname:
             return None
 
         namebytes = bytearray(lowname, 'UTF-8')
         basehash = self._get_hash(namebytes[:-1]) #up to last byte
-        for c in self.FNV_DICT: #try each last char
-            id_hash = self._get_partial_hash(basehash, ord(c))
+        value = self._get_partial_hash(basehash, 0) ^ id
 
-            if id_hash == id:
-                c = c.upper()
-                for cs in hashname: #upper only if all base name is all upper
-                    if cs.islower():
-                       c = c.lower()
-                       break
-
-                hashname = hashname[:-1] + c
-                return hashname
-        # it's possible to reach here with incorrect (manually input) ids,
+        # it's possible to get other values with incorrect (manually input) ids,
         # since not all 255 values are in FNV_DICT
-        return None
+        if value not in self.FNV_DICT_BYTES:
+            return None
+
+        c = chr(value).upper()
+        for cs in hashname: #upper only if all base name is all upper
+            if cs.islower():
+               c = c.lower()
+               break
+
+        hashname = hashname[:-1] + c
+        return hashname
 
     def unfuzzy_hashname(self, id, hashname):
         return self.unfuzzy_hashname_lw(id, hashname.lower(), hashname)
@@ -738,7 +738,7 @@ class Gui(object):
         _, base_name = infoname
         default_name = base_name + '.xml'
 
-        filetypes = (("XML file",".xml"),("XML file (complete)",".xmlc"),("TXT file",".txt"))
+        filetypes = (("XML file",".xml"),("XML file (complete)",".xmlc"),("TXT file",".txt"),("JSON file",".json"),("NDJSON file",".ndjson"))
         outpath = filedialog.asksaveasfilename(initialfile=default_name, defaultextension="*.*", filetypes=filetypes)
         if not outpath:
             return
@@ -748,6 +748,8 @@ class Gui(object):
             (".xml", wdumper.TYPE_XSL_SMALLER),
             (".xmlc", wdumper.TYPE_XSL),
             (".txt", wdumper.TYPE_TXT),
+            (".json", wdumper.TYPE_JSON),
+            (".ndjson", wdumper.TYPE_NDJSON), #after .json (same ending)
         )
         
         for ext, type in dump_types:
@@ -1,14 +1,19 @@
+import os, tempfile, threading, socket, urllib.request, urllib.error
 from .generator.render import bnode_rtpc
+from .parser import wparser
+from .viewer import wdumper, wview
 
 
 class Tests(object):
     def __init__(self):
         pass
         
-    def main(self):
+    def main(self, filenames=None):
         print("tests")
         
         GraphTests().start()
+        DumpTests(filenames).start()
+        ViewerTests(filenames).start()
         pass
 
     def _info(self):
@@ -109,3 +114,114 @@ class GraphTest(object):
         self.scaling = scaling
         self.points = points
         self.values = values
+
+# dumps of the same banks with other parser modes must be the same as regular ones
+class DumpTests(object):
+    TYPES = [wdumper.TYPE_TXT, wdumper.TYPE_XML, wdumper.TYPE_JSON, wdumper.TYPE_NDJSON]
+
+    def __init__(self, filenames):
+        self.filenames = filenames
+        self.modes = [
+            DumpMode('lazy', lazy=True),
+            DumpMode('stream', stream=True),
+        ]
+
+    def start(self):
+        if not self.filenames:
+            return
+
+        with tempfile.TemporaryDirectory() as outdir:
+            for type in self.TYPES:
+                base = self._dump(outdir, type, DumpMode('default'))
+                for mode in self.modes:
+                    dump = self._dump(outdir, type, mode)
+                    result = 'ok' if dump == base else 'DIFFERENT'
+                    print("- dump %s, %s: %s" % (type, mode.name, result))
+        print("")
+
+    def _dump(self, outdir, type, mode):
+        parser = wparser.Parser()
+        parser.set_lazy(mode.lazy)
+        parser.set_skip_items(mode.stream)
+        parser.parse_banks(self.filenames)
+
+        name = os.path.join(outdir, 'dump')
+        dumper = wdumper.DumpPrinter(parser.get_banks(), type, name)
+        if mode.stream:
+            dumper.set_stream(parser)
+        dumper.dump()
+
+        outname = '%s.%s' % (name, type)
+        with open(outname, 'r', encoding='utf-8') as infile:
+            dump = infile.read()
+        os.remove(outname)
+        return dump
+
+class DumpMode(object):
+    def __init__(self, name, lazy=False, stream=False):
+        self.name = name
+        self.lazy = lazy
+        self.stream = stream
+
+# viewer requests with bad params must be rejected rather than failing in the handler,
+# and idle connections must not block other requests
+class ViewerTests(object):
+    IDLE_CONNECTIONS = 10
+    def __init__(self, filenames):
+        self.filenames = filenames
+        self.tests = [
+            ('/load-node?id=0', 200),
+            ('/load-node?id=999', 404),
+            ('/load-node', 400),
+            ('/load-node?id=', 400),
+            ('/api/node', 400),
+            ('/api/list', 400),
+            ('/api/list?id=0&start=x', 400),
+            ('/api/list?id=0&count=-1', 400),
+            ('/api/list?id=0&count=0', 400),
+            ('/search?q=a&max=x', 400),
+            ('/load-docs', 400),
+            ('/load-docs?doc=x', 400),
+        ]
+
+    def start(self):
+        if not self.filenames:
+            return
+
+        parser = wparser.Parser()
+        parser.parse_banks(self.filenames)
+        handler = wview.HandlerFactory(parser)
+
+        self._test('threaded', wview.ThreadedHTTPServer(('localhost', 0), handler))
+        self._test('async', wview.AsyncHTTPServer(('localhost', 0), handler, 1))
+        print("")
+
+    def _test(self, name, httpd):
+        thread = threading.Thread(target=httpd.serve_forever)
+        thread.start()
+        try:
+            port = httpd.server_address[1]
+            for url, expected in self.tests:
+                status = self._get(port, url)
+                result = 'ok' if status == expected else 'FAILED (%s)' % (status)
+                print("- viewer %s %s: %s" % (name, url, result))
+
+            idle = [socket.create_connection(('localhost', port)) for _ in range(self.IDLE_CONNECTIONS)]
+            status = self._get(port, '/wwiser')
+            for sock in idle:
+                sock.close()
+            result = 'ok' if status == 200 else 'FAILED (%s)' % (status)
+            print("- viewer %s with idle connections: %s" % (name, result))
+        finally:
+            httpd.shutdown()
+            thread.join()
+
+    def _get(self, port, url):
+        try:
+            with urllib.request.urlopen('http://localhost:%i%s' % (port, url), timeout=5) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+        except (socket.timeout, OSError): #handler failed or blocked (timeouts aren't TimeoutError before 3.10)
+            return None